@@ -0,0 +1,82 @@
+import sys
+import os
+import json
+import random
+import string
+import logging
+import argparse
+import tempfile
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+
+import mock_solr_service
+from misc_scripts import common, solr_backup
+
+BENCHMARK_CLUSTER = 'benchmark_cluster'
+BENCHMARK_COLLECTION = 'benchmark_restore'
+
+def generate_backup(backup_dir, doc_count, field_size, output_format, compression):
+    '''
+    Writes a synthetic backup of doc_count documents with the backup writer of misc_scripts.solr_backup.
+    '''
+    backup_writer = solr_backup.BackupWriter(os.path.join(backup_dir, 'source_%d' % doc_count), output_format, compression, max_docs=50000)
+    for doc_number in range(doc_count):
+        backup_writer.write({'id': 'doc_%09d' % doc_number, '_version_': doc_number + 1,
+                             'title': 'title %d' % doc_number, 'body': ''.join(random.choice(string.ascii_letters + ' ') for _ in range(field_size))})
+    backup_writer.close()
+    return backup_writer.file_names
+
+def benchmark_driver(parameters):
+    work_dir = tempfile.mkdtemp(prefix='solr_restore_benchmark_')
+    mock_config = mock_solr_service.MockSolrConfig(latency=parameters.latency, index_time_per_doc=parameters.index_time, error_probability=parameters.error_probability)
+    mock_server = mock_solr_service.start_mock_service(mock_config, port=parameters.port)
+    creds_file = os.path.join(work_dir, 'benchmark_creds.json')
+    with open(creds_file, 'w', encoding='utf8') as creds:
+        json.dump({'benchmark': {'url': 'http://127.0.0.1:%d' % mock_server.server_address[1], 'username': 'benchmark', 'password': 'benchmark'}}, creds)
+
+    results = []
+    try:
+        for doc_count in parameters.sizes:
+            backup_dir = tempfile.mkdtemp(dir=work_dir)
+            generate_backup(backup_dir, doc_count, parameters.field_size, parameters.output_format, parameters.compression)
+            for restore_threads in parameters.threads:
+                mock_server.collections.pop(BENCHMARK_COLLECTION, None)
+                restore_parameters = argparse.Namespace(user_creds_file=creds_file, user_creds_key='benchmark', cluster_id=BENCHMARK_CLUSTER,
+                                                        collection_name=BENCHMARK_COLLECTION, backup_collection_name=None, restore_location=backup_dir, output_dir=work_dir,
+                                                        batch_size=parameters.batch_size, restore_threads=restore_threads, commit_within=solr_backup.RESTORE_COMMIT_WITHIN)
+                restore_stats = solr_backup.restore_driver(restore_parameters)
+                restored_count = len(mock_server.collections[BENCHMARK_COLLECTION].documents)
+                restore_stats.update({'documents': doc_count, 'threads': restore_threads, 'documents_in_collection': restored_count})
+                results.append(restore_stats)
+    finally:
+        mock_server.shutdown()
+
+    print('%-10s %-8s %12s %12s %10s %10s' % ('documents', 'threads', 'seconds', 'docs/sec', 'failed', 'in_solr'))
+    for result in results:
+        print('%-10d %-8d %12s %12s %10d %10d' % (result['documents'], result['threads'], result['elapsed_seconds'], result['documents_per_second'],
+                                                 result['documents_failed'], result['documents_in_collection']))
+    if parameters.results_file:
+        with open(parameters.results_file, 'w', encoding='utf8') as results_file:
+            json.dump(results, results_file, indent=4)
+
+if __name__ == '__main__':
+    if sys.version_info[0] < 3:
+        raise Exception("Python 3 or higher version is required for this script.")
+
+    parser = argparse.ArgumentParser(prog="python %s)" % os.path.basename(__file__), description='Benchmarks the solr_backup restore throughput against a local mock Solr service')
+    parser.add_argument('-sizes', dest='sizes', type=lambda value: [int(size) for size in value.split(',')], default=[10000, 50000], help='Comma separated backup sizes (number of documents)')
+    parser.add_argument('-threads', dest='threads', type=lambda value: [int(threads) for threads in value.split(',')], default=[1, 4], help='Comma separated numbers of restore threads')
+    parser.add_argument('-batch-size', dest='batch_size', type=int, default=solr_backup.RESTORE_BATCH_SIZE, help='Documents per restore batch')
+    parser.add_argument('-format', dest='output_format', choices=solr_backup.OUTPUT_FORMATS, default=solr_backup.OUTPUT_FORMAT_NDJSON, help='Backup file format')
+    parser.add_argument('-compress', dest='compression', choices=(solr_backup.COMPRESSION_GZIP, solr_backup.COMPRESSION_ZSTD), help='Backup file compression')
+    parser.add_argument('-field-size', dest='field_size', type=int, default=256, help='Characters in the body field of each document')
+    parser.add_argument('-latency', dest='latency', type=float, default=0.01, help='Mock Solr latency per request in seconds')
+    parser.add_argument('-index-time', dest='index_time', type=float, default=0.0001, help='Mock Solr indexing time per document in seconds')
+    parser.add_argument('-error-probability', dest='error_probability', type=float, default=0.0, help='Mock Solr probability of a failed update')
+    parser.add_argument('-port', dest='port', type=int, default=0, help='Mock service port (0 picks a free port)')
+    parser.add_argument('-results-file', dest='results_file', help='Write the results as JSON to this file')
+    args = parser.parse_args()
+
+    common.initialize_logger(logging.WARNING)
+    benchmark_driver(args)
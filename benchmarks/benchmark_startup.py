@@ -0,0 +1,92 @@
+import sys
+import os
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+
+from misc_scripts import cli
+
+HEAVY_MODULES = ('requests', 'pysolr', 'asyncio', 'multiprocessing', 'sqlite3')
+#Interpreter startup alone, the floor of every command
+BASELINE_SCENARIO = 'python'
+
+def get_scenario_arguments(scenario):
+    '''
+    The baseline runs an empty interpreter, the other scenarios parse the options of a command (-h exits right after,
+    once the command module is imported). Dependencies imported by the drivers themselves (pysolr when the first Solr
+    client is created, multiprocessing for batch extractions) are not part of the startup.
+    '''
+    if scenario == BASELINE_SCENARIO:
+        return [sys.executable, '-c', 'pass']
+    return [sys.executable, '-m', 'misc_scripts', scenario, '-h']
+
+def get_imported_modules(scenario):
+    '''
+    Heavy modules imported by a command, checked in a fresh interpreter running the command in-process.
+    '''
+    check_code = ('import sys\nfrom misc_scripts import cli\ntry:\n    cli.main([%r, "-h"])\nexcept SystemExit:\n    pass\n'
+                  'sys.stderr.write(",".join(module for module in %r if module in sys.modules))' % (scenario, HEAVY_MODULES))
+    check = subprocess.run([sys.executable, '-c', check_code], cwd=os.path.dirname(BENCHMARKS_DIR), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    return [module for module in check.stderr.strip().split(',') if module]
+
+def time_scenario(scenario, repeats):
+    arguments = get_scenario_arguments(scenario)
+    timings = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        subprocess.run(arguments, cwd=os.path.dirname(BENCHMARKS_DIR), stdout=subprocess.DEVNULL, check=True)
+        timings.append((time.perf_counter() - start_time) * 1000)
+    return {'scenario': scenario, 'min_ms': round(min(timings), 1), 'median_ms': round(statistics.median(timings), 1),
+            'heavy_modules': [] if scenario == BASELINE_SCENARIO else get_imported_modules(scenario)}
+
+def compare_results(results, baseline_file, max_regression):
+    '''
+    Compares median startup times with a previous results file. Returns the scenarios slower by more than
+    max_regression (a fraction of the previous median, with 5 ms of tolerance for timer noise).
+    '''
+    with open(baseline_file, encoding='utf8') as baseline:
+        previous_results = {result['scenario']: result for result in json.load(baseline)}
+    regressions = []
+    for result in results:
+        previous_result = previous_results.get(result['scenario'])
+        if previous_result is None:
+            continue
+        result['previous_median_ms'] = previous_result['median_ms']
+        if result['median_ms'] > previous_result['median_ms'] * (1 + max_regression) + 5:
+            regressions.append(result['scenario'])
+    return regressions
+
+def benchmark_driver(parameters):
+    results = [time_scenario(scenario, parameters.repeats) for scenario in [BASELINE_SCENARIO] + parameters.commands]
+    regressions = compare_results(results, parameters.baseline_file, parameters.max_regression) if parameters.baseline_file else []
+
+    print('%-10s %10s %12s %14s  %s' % ('command', 'min_ms', 'median_ms', 'previous_ms', 'heavy_modules'))
+    for result in results:
+        print('%-10s %10s %12s %14s  %s' % (result['scenario'], result['min_ms'], result['median_ms'], result.get('previous_median_ms', '-'),
+                                            ','.join(result['heavy_modules']) or '-'))
+    if parameters.results_file:
+        with open(parameters.results_file, 'w', encoding='utf8') as results_file:
+            json.dump(results, results_file, indent=4)
+    if regressions:
+        print('Startup regressions (more than %d%% slower): %s' % (parameters.max_regression * 100, ', '.join(regressions)))
+    return regressions
+
+if __name__ == '__main__':
+    if sys.version_info[0] < 3:
+        raise Exception("Python 3 or higher version is required for this script.")
+
+    parser = argparse.ArgumentParser(prog="python %s)" % os.path.basename(__file__), description='Benchmarks the cold start time of each misc_scripts command')
+    parser.add_argument('-commands', dest='commands', type=lambda value: value.split(','), default=list(cli.COMMANDS), help='Comma separated commands to time')
+    parser.add_argument('-repeats', dest='repeats', type=int, default=20, help='Cold starts timed per command')
+    parser.add_argument('-results-file', dest='results_file', help='Write the results as JSON to this file')
+    parser.add_argument('-baseline-file', dest='baseline_file', help='Results file of a previous run to compare with, exits with status 1 on regressions')
+    parser.add_argument('-max-regression', dest='max_regression', type=float, default=0.2, help='Tolerated slowdown of the median startup time, as a fraction')
+    args = parser.parse_args()
+
+    if benchmark_driver(args):
+        sys.exit(1)
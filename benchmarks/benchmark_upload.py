@@ -0,0 +1,159 @@
+import sys
+import os
+import json
+import time
+import random
+import string
+import logging
+import argparse
+import resource
+import subprocess
+import tempfile
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+
+import mock_discovery_service
+
+DOC_SHAPES = {
+    # name: (number of text fields, characters per field, nested list length)
+    'small': (2, 64, 0),
+    'medium': (8, 512, 4),
+    'large': (16, 4096, 16),
+}
+CORPUS_FORMATS = ('array', 'ndjson')
+BENCHMARK_ENVIRONMENT = 'benchmark_env'
+BENCHMARK_COLLECTION = 'benchmark_col'
+
+def generate_document(doc_number, doc_shape):
+    field_count, field_size, nested_size = DOC_SHAPES[doc_shape]
+    doc = {'id': 'doc_%d' % doc_number}
+    for field_number in range(field_count):
+        doc['field_%d' % field_number] = ''.join(random.choice(string.ascii_letters + ' ') for _ in range(field_size))
+    if nested_size:
+        doc['sections'] = [{'title': 'section %d' % i, 'weight': random.random()} for i in range(nested_size)]
+    return doc
+
+def generate_corpus(corpus_dir, doc_count, doc_shape, corpus_format):
+    '''
+    Writes a synthetic corpus of doc_count documents of the given shape as a JSON array or NDJSON file.
+    '''
+    corpus_file_name = os.path.join(corpus_dir, 'corpus_%s_%d.%s' % (doc_shape, doc_count, 'json' if corpus_format == 'array' else 'ndjson'))
+    with open(corpus_file_name, 'w', encoding='utf8') as corpus_file:
+        if corpus_format == 'array':
+            corpus_file.write('[')
+        for doc_number in range(doc_count):
+            if corpus_format == 'array':
+                corpus_file.write((',' if doc_number else '') + json.dumps(generate_document(doc_number, doc_shape)))
+            else:
+                corpus_file.write(json.dumps(generate_document(doc_number, doc_shape)) + '\n')
+        if corpus_format == 'array':
+            corpus_file.write(']')
+    return corpus_file_name
+
+def run_scenario(scenario):
+    '''
+    Runs a single upload scenario in this process against the mock service and prints its results as JSON. Run in a
+    separate process per scenario so that the peak RSS belongs to that scenario only.
+    '''
+    from misc_scripts import common, discovery_upload
+
+    common.initialize_logger(logging.WARNING)
+    parameters = argparse.Namespace(
+        input_seed=scenario['corpus_file'], user_creds_file=scenario['creds_file'], user_creds_key='benchmark',
+        output_dir=scenario['output_dir'], environment_id=BENCHMARK_ENVIRONMENT, collection_id=BENCHMARK_COLLECTION,
+        max_workers=scenario['threads'], max_in_flight=scenario['max_in_flight'], initial_rate=scenario['initial_rate'],
+        max_rate=scenario['max_rate'], upload_engine=scenario['engine'], file_workers=discovery_upload.FILE_PIPELINE_THREADS,
+        resume_dir=None, manifest_file=None, delete_missing=False, targets=None,
+        verify_status=False, verify_timeout=discovery_upload.STATUS_POLL_TIMEOUT)
+    if scenario['shards'] > 1:
+        parameters.targets = ['benchmark:%s:%s_%d' % (BENCHMARK_ENVIRONMENT, BENCHMARK_COLLECTION, shard) for shard in range(scenario['shards'])]
+
+    start_time = time.time()
+    discovery_upload.upload_driver(parameters)
+    elapsed_time = time.time() - start_time
+
+    last_snapshot = {}
+    for subdir, dirs, files in os.walk(scenario['output_dir']):
+        if discovery_upload.METRICS_FILE_NAME in files:
+            with open(os.path.join(subdir, discovery_upload.METRICS_FILE_NAME), encoding='utf8') as metrics_file:
+                for line in metrics_file:
+                    last_snapshot = json.loads(line)
+    completed = last_snapshot.get('documents_completed', 0)
+    print(json.dumps({
+        'elapsed_seconds': round(elapsed_time, 3),
+        'documents_completed': completed,
+        'documents_failed': last_snapshot.get('documents_failed', 0),
+        'documents_per_second': round(completed / elapsed_time, 2) if elapsed_time else None,
+        'bytes_per_second': round(last_snapshot.get('bytes_sent', 0) / elapsed_time, 2) if elapsed_time else None,
+        'latency_seconds': last_snapshot.get('total_latency_seconds'),
+        'throttled_responses': last_snapshot.get('throttled_responses', 0),
+        'retries': last_snapshot.get('retries', 0),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, 1),
+    }))
+
+def benchmark_driver(parameters):
+    work_dir = tempfile.mkdtemp(prefix='discovery_benchmark_')
+    mock_config = mock_discovery_service.MockServiceConfig(latency=parameters.latency, latency_jitter=parameters.latency / 2,
+                                                          throttle_probability=parameters.throttle_probability,
+                                                          error_probability=parameters.error_probability, max_rps=parameters.max_rps)
+    mock_server = mock_discovery_service.start_mock_service(mock_config, port=parameters.port)
+    creds_file = os.path.join(work_dir, 'benchmark_creds.json')
+    with open(creds_file, 'w', encoding='utf8') as creds:
+        json.dump({'benchmark': {'url': 'http://127.0.0.1:%d' % mock_server.server_address[1], 'username': 'benchmark', 'password': 'benchmark'}}, creds)
+
+    results = []
+    try:
+        for doc_count in parameters.sizes:
+            for doc_shape in parameters.shapes:
+                corpus_file = generate_corpus(work_dir, doc_count, doc_shape, parameters.corpus_format)
+                for engine in parameters.engines:
+                    scenario = {'corpus_file': corpus_file, 'creds_file': creds_file, 'output_dir': tempfile.mkdtemp(dir=work_dir),
+                                'threads': parameters.threads, 'max_in_flight': parameters.max_in_flight, 'initial_rate': parameters.initial_rate,
+                                'max_rate': parameters.max_rate, 'engine': engine, 'shards': parameters.shards}
+                    scenario_run = subprocess.run([sys.executable, os.path.abspath(__file__), '-run-scenario', json.dumps(scenario)],
+                                                  stdout=subprocess.PIPE, universal_newlines=True, check=True)
+                    result = json.loads(scenario_run.stdout.strip().splitlines()[-1])
+                    result.update({'documents': doc_count, 'shape': doc_shape, 'engine': engine})
+                    results.append(result)
+                    mock_discovery_service.LOGGER.info('benchmark_driver  -  Scenario result [%s]' % json.dumps(result))
+    finally:
+        mock_server.shutdown()
+
+    print('%-10s %-8s %-8s %12s %14s %8s %8s %8s %10s %10s' % ('documents', 'shape', 'engine', 'docs/sec', 'bytes/sec', 'p50', 'p95', 'p99', '429s', 'rss_mb'))
+    for result in results:
+        latency = result['latency_seconds'] or {}
+        print('%-10d %-8s %-8s %12s %14s %8s %8s %8s %10d %10s' % (result['documents'], result['shape'], result['engine'], result['documents_per_second'],
+                                                                 result['bytes_per_second'], latency.get('p50'), latency.get('p95'), latency.get('p99'),
+                                                                 result['throttled_responses'], result['peak_rss_mb']))
+    if parameters.results_file:
+        with open(parameters.results_file, 'w', encoding='utf8') as results_file:
+            json.dump(results, results_file, indent=4)
+
+if __name__ == '__main__':
+    if sys.version_info[0] < 3:
+        raise Exception("Python 3 or higher version is required for this script.")
+
+    parser = argparse.ArgumentParser(prog="python %s)" % os.path.basename(__file__), description='Benchmarks the discovery_upload throughput against a local mock Discovery service')
+    parser.add_argument('-sizes', dest='sizes', type=lambda value: [int(size) for size in value.split(',')], default=[1000, 10000], help='Comma separated corpus sizes (number of documents)')
+    parser.add_argument('-shapes', dest='shapes', type=lambda value: value.split(','), default=['small', 'medium'], help='Comma separated document shapes: %s' % ', '.join(DOC_SHAPES))
+    parser.add_argument('-format', dest='corpus_format', choices=CORPUS_FORMATS, default='array', help='Corpus file format')
+    parser.add_argument('-engines', dest='engines', type=lambda value: value.split(','), default=['threads'], help='Comma separated upload engines: threads, asyncio')
+    parser.add_argument('-threads', dest='threads', type=int, default=8, help='Upload worker threads')
+    parser.add_argument('-max-in-flight', dest='max_in_flight', type=int, default=64, help='Maximum uploads in flight')
+    parser.add_argument('-initial-rate', dest='initial_rate', type=float, default=100.0, help='Initial upload requests per second')
+    parser.add_argument('-max-rate', dest='max_rate', type=float, default=5000.0, help='Maximum upload requests per second')
+    parser.add_argument('-shards', dest='shards', type=int, default=1, help='Number of mock collections to shard the upload across')
+    parser.add_argument('-latency', dest='latency', type=float, default=0.02, help='Mock service latency in seconds')
+    parser.add_argument('-throttle-probability', dest='throttle_probability', type=float, default=0.0, help='Mock service probability of 429')
+    parser.add_argument('-error-probability', dest='error_probability', type=float, default=0.0, help='Mock service probability of 500')
+    parser.add_argument('-max-rps', dest='max_rps', type=int, help='Mock service requests per second quota')
+    parser.add_argument('-port', dest='port', type=int, default=0, help='Mock service port (0 picks a free port)')
+    parser.add_argument('-results-file', dest='results_file', help='Write the results as JSON to this file')
+    parser.add_argument('-run-scenario', dest='scenario', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.scenario:
+        run_scenario(json.loads(args.scenario))
+    else:
+        benchmark_driver(args)
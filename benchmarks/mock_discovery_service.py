@@ -0,0 +1,187 @@
+import sys
+import os
+import json
+import time
+import uuid
+import random
+import logging
+import argparse
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+
+from misc_scripts import common
+
+DOCUMENTS_PATH_PREFIX = '/v1/environments/'
+DEFAULT_PORT = 8089
+
+LOGGER = common.initialize_logger(logging.INFO, os.path.basename(__file__))
+
+class MockServiceConfig:
+    def __init__(self, latency=0.0, latency_jitter=0.0, throttle_probability=0.0, error_probability=0.0, max_rps=None, retry_after=None,
+                 processing_time=0.0, processing_failure_probability=0.0):
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.throttle_probability = throttle_probability
+        self.error_probability = error_probability
+        self.max_rps = max_rps
+        self.retry_after = retry_after
+        self.processing_time = processing_time
+        self.processing_failure_probability = processing_failure_probability
+        self.lock = threading.Lock()
+        self.quota_windows = {}
+        self.stats = {'requests': 0, 'throttled': 0, 'errors': 0, 'created': 0, 'deleted': 0, 'status_checks': 0}
+
+    def is_over_quota(self, collection_id):
+        '''
+        Fixed one second window quota per collection, emulating the per-collection request rate limit of the service.
+        '''
+        if self.max_rps is None:
+            return False
+        with self.lock:
+            now = time.monotonic()
+            window_start, window_count = self.quota_windows.get(collection_id, (now, 0))
+            if now - window_start >= 1.0:
+                window_start, window_count = now, 0
+            self.quota_windows[collection_id] = (window_start, window_count + 1)
+            return window_count + 1 > self.max_rps
+
+    def count(self, stat_name):
+        with self.lock:
+            self.stats[stat_name] += 1
+
+class MockDiscoveryHandler(BaseHTTPRequestHandler):
+    '''
+    Local stand-in for the Discovery /v1/environments/{env}/collections/{col}/documents endpoints. Reads the full request
+    body, waits the configured latency, and answers with 429 / 500 according to the configured probabilities and quota.
+    Uploaded documents stay 'processing' for the configured processing time, then become 'available' or 'failed'.
+    '''
+    protocol_version = 'HTTP/1.1'
+    #Headers and body are separate writes, with Nagle's algorithm the body waits for the client's delayed ACK (~40 ms)
+    disable_nagle_algorithm = True
+    config = MockServiceConfig()
+    documents = {}
+
+    def log_message(self, format, *args):
+        LOGGER.debug(format % args)
+
+    def send_json(self, status_code, content, extra_headers=None):
+        body = json.dumps(content).encode('utf8')
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for header_name, header_value in (extra_headers or {}).items():
+            self.send_header(header_name, header_value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def parse_document_path(self):
+        path = self.path.split('?')[0]
+        parts = path[len(DOCUMENTS_PATH_PREFIX):].split('/') if path.startswith(DOCUMENTS_PATH_PREFIX) else []
+        # env_id, 'collections', col_id, 'documents' [, document_id]
+        if len(parts) < 4 or parts[1] != 'collections' or parts[3] != 'documents':
+            return None, None
+        return parts[2], (parts[4] if len(parts) > 4 and parts[4] else None)
+
+    def simulate_service(self, collection_id):
+        config = self.config
+        config.count('requests')
+        if config.latency or config.latency_jitter:
+            time.sleep(max(0.0, config.latency + random.uniform(-config.latency_jitter, config.latency_jitter)))
+        if config.is_over_quota(collection_id) or random.random() < config.throttle_probability:
+            config.count('throttled')
+            headers = {'Retry-After': str(config.retry_after)} if config.retry_after is not None else None
+            self.send_json(429, {'code': 429, 'error': 'Too many requests'}, headers)
+            return False
+        if random.random() < config.error_probability:
+            config.count('errors')
+            self.send_json(500, {'code': 500, 'error': 'Internal server error'})
+            return False
+        return True
+
+    def do_POST(self):
+        content_length = int(self.headers.get('Content-Length', 0))
+        remaining = content_length
+        while remaining > 0:
+            remaining -= len(self.rfile.read(min(remaining, 65536)))
+        collection_id, document_id = self.parse_document_path()
+        if collection_id is None:
+            self.send_json(404, {'code': 404, 'error': 'Not found'})
+            return
+        if not self.simulate_service(collection_id):
+            return
+        document_id = document_id or uuid.uuid4().hex
+        final_state = 'failed' if random.random() < self.config.processing_failure_probability else 'available'
+        self.documents[(collection_id, document_id)] = (time.monotonic() + self.config.processing_time, final_state)
+        self.config.count('created')
+        self.send_json(202, {'document_id': document_id, 'status': 'processing'})
+
+    def do_GET(self):
+        collection_id, document_id = self.parse_document_path()
+        if collection_id is None or document_id is None:
+            self.send_json(404, {'code': 404, 'error': 'Not found'})
+            return
+        if not self.simulate_service(collection_id):
+            return
+        self.config.count('status_checks')
+        document = self.documents.get((collection_id, document_id))
+        if document is None:
+            self.send_json(404, {'code': 404, 'error': 'Document not found'})
+            return
+        ready_time, final_state = document
+        status = final_state if time.monotonic() >= ready_time else 'processing'
+        notices = [{'notice_id': 'index_failed', 'severity': 'error', 'description': 'Mock document processing failure'}] if status == 'failed' else []
+        self.send_json(200, {'document_id': document_id, 'status': status, 'notices': notices})
+
+    def do_DELETE(self):
+        collection_id, document_id = self.parse_document_path()
+        if collection_id is None or document_id is None:
+            self.send_json(404, {'code': 404, 'error': 'Not found'})
+            return
+        if not self.simulate_service(collection_id):
+            return
+        self.documents.pop((collection_id, document_id), None)
+        self.config.count('deleted')
+        self.send_json(200, {'document_id': document_id, 'status': 'deleted'})
+
+def start_mock_service(config, port=DEFAULT_PORT, host='127.0.0.1'):
+    '''
+    Starts the mock service in a background thread and returns the server (call shutdown() to stop it).
+    '''
+    handler_class = type('ConfiguredMockDiscoveryHandler', (MockDiscoveryHandler,), {'config': config, 'documents': {}})
+    server = ThreadingHTTPServer((host, port), handler_class)
+    server.daemon_threads = True
+    server_thread = threading.Thread(target=server.serve_forever, name='mock_discovery', daemon=True)
+    server_thread.start()
+    LOGGER.info('start_mock_service  -  Mock Discovery service listening on http://%s:%d' % (host, server.server_address[1]))
+    return server
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog="python %s)" % os.path.basename(__file__), description='Local mock of the Discovery document upload API for benchmarks')
+    parser.add_argument('-port', dest='port', type=int, default=DEFAULT_PORT, help='Port to listen on')
+    parser.add_argument('-latency', dest='latency', type=float, default=0.02, help='Response latency in seconds')
+    parser.add_argument('-latency-jitter', dest='latency_jitter', type=float, default=0.01, help='Random latency variation in seconds')
+    parser.add_argument('-throttle-probability', dest='throttle_probability', type=float, default=0.0, help='Probability of answering 429')
+    parser.add_argument('-error-probability', dest='error_probability', type=float, default=0.0, help='Probability of answering 500')
+    parser.add_argument('-max-rps', dest='max_rps', type=int, help='Requests per second quota, requests over it get 429')
+    parser.add_argument('-processing-time', dest='processing_time', type=float, default=0.0, help='Seconds before an uploaded document leaves the processing state')
+    parser.add_argument('-processing-failure-probability', dest='processing_failure_probability', type=float, default=0.0, help='Probability of a document ending in the failed state')
+    parser.add_argument('-retry-after', dest='retry_after', type=int, help='Retry-After seconds sent with 429 responses')
+    parser.add_argument('-debug', dest="log_level", help="Set DEBUG logging level", action="store_const",
+                        const=logging.DEBUG, default=logging.INFO)
+    args = parser.parse_args()
+
+    common.initialize_logger(args.log_level, LOGGER.name)
+    mock_config = MockServiceConfig(latency=args.latency, latency_jitter=args.latency_jitter, throttle_probability=args.throttle_probability,
+                                    error_probability=args.error_probability, max_rps=args.max_rps, retry_after=args.retry_after,
+                                    processing_time=args.processing_time, processing_failure_probability=args.processing_failure_probability)
+    mock_server = start_mock_service(mock_config, port=args.port)
+    try:
+        while True:
+            time.sleep(10)
+            LOGGER.info('Mock service statistics [%s]' % json.dumps(mock_config.stats))
+    except KeyboardInterrupt:
+        mock_server.shutdown()
@@ -0,0 +1,272 @@
+import sys
+import os
+import re
+import io
+import csv
+import json
+import time
+import zlib
+import base64
+import bisect
+import random
+import logging
+import argparse
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+
+from misc_scripts import common
+
+DEFAULT_PORT = 8983
+DEFAULT_ROWS = 10
+HASH_FILTER_PATTERN = re.compile(r'\{!hash workers=(\d+) worker=(\d+)\}')
+RANGE_FILTER_PATTERN = re.compile(r'(\w+):([\[{])(\*|"(?:[^"\\]|\\.)*"|\S+) TO (\*|"(?:[^"\\]|\\.)*"|\S+)([\]}])')
+
+LOGGER = common.initialize_logger(logging.INFO, os.path.basename(__file__))
+
+def parse_range_bound(bound, field_value):
+    if bound == '*':
+        return None
+    if bound.startswith('"'):
+        return json.loads(bound)
+    return type(field_value)(bound) if isinstance(field_value, (int, float)) else bound
+
+def get_id_lower_bound(filter_queries):
+    '''
+    Returns the exclusive lower bound of an id:{"value" TO *] filter (used by CSV paging), or None.
+    '''
+    for filter_query in filter_queries:
+        range_match = RANGE_FILTER_PATTERN.match(filter_query)
+        if range_match and range_match.group(1) == 'id' and range_match.group(2) == '{' and range_match.group(3).startswith('"'):
+            return json.loads(range_match.group(3))
+    return None
+
+def write_csv_documents(docs, field_names):
+    '''
+    Solr CSV writer: header row, one row per document, multi valued fields joined by commas.
+    '''
+    if field_names is None:
+        field_names = sorted(set(field_name for doc in docs for field_name in doc))
+    csv_output = io.StringIO()
+    csv_writer = csv.writer(csv_output, lineterminator='\n')
+    csv_writer.writerow(field_names)
+    for doc in docs:
+        csv_writer.writerow([','.join(str(value) for value in doc[field_name]) if isinstance(doc.get(field_name), list) else doc.get(field_name, '')
+                             for field_name in field_names])
+    return csv_output.getvalue()
+
+def matches_filter(doc, filter_query):
+    '''
+    Supports the filters used by misc_scripts.solr_backup: *:*, {!hash workers=N worker=i} on the id, inclusive / exclusive
+    ranges (field:[a TO b}) and field:value.
+    '''
+    if filter_query == '*:*':
+        return True
+    hash_match = HASH_FILTER_PATTERN.match(filter_query)
+    if hash_match:
+        return zlib.crc32(str(doc['id']).encode('utf8')) % int(hash_match.group(1)) == int(hash_match.group(2))
+    range_match = RANGE_FILTER_PATTERN.match(filter_query)
+    if range_match:
+        field_value = doc.get(range_match.group(1))
+        if field_value is None:
+            return False
+        lower_bound = parse_range_bound(range_match.group(3), field_value)
+        upper_bound = parse_range_bound(range_match.group(4), field_value)
+        if lower_bound is not None and (field_value < lower_bound or (range_match.group(2) == '{' and field_value == lower_bound)):
+            return False
+        if upper_bound is not None and (field_value > upper_bound or (range_match.group(5) == '}' and field_value == upper_bound)):
+            return False
+        return True
+    field_name, field_value = filter_query.split(':', 1)
+    return str(doc.get(field_name)) == field_value.strip('"')
+
+class MockSolrCollection:
+    '''
+    In-memory collection: documents by id plus a lazily sorted id list, so cursor pages sorted by id are served with a
+    binary search instead of sorting the collection on every request.
+    '''
+    def __init__(self):
+        self.documents = {}
+        self.sorted_ids = []
+        self.sorted = True
+        self.lock = threading.Lock()
+
+    def add(self, docs):
+        with self.lock:
+            for doc in docs:
+                if doc['id'] not in self.documents:
+                    self.sorted = False
+                self.documents[doc['id']] = doc
+
+    def get_sorted_ids(self):
+        with self.lock:
+            if not self.sorted:
+                self.sorted_ids = sorted(self.documents)
+                self.sorted = True
+            return self.sorted_ids
+
+class MockSolrConfig:
+    def __init__(self, latency=0.0, index_time_per_doc=0.0, error_probability=0.0):
+        self.latency = latency
+        self.index_time_per_doc = index_time_per_doc
+        self.error_probability = error_probability
+        self.lock = threading.Lock()
+        self.stats = {'selects': 0, 'updates': 0, 'documents_added': 0, 'commits': 0, 'errors': 0}
+
+    def count(self, stat_name, amount=1):
+        with self.lock:
+            self.stats[stat_name] += amount
+
+class MockSolrHandler(BaseHTTPRequestHandler):
+    '''
+    Local stand-in for the Solr select and update handlers used by misc_scripts.solr_backup. Any path ending in /select or /update
+    is served, the collection being the path segment before the handler. Selects support cursor paging sorted by id, fq,
+    fl, rows, start and the json and csv writers (csv drops nextCursorMark like Solr does). Updates accept JSON document lists and XML commits, waiting index_time_per_doc per document.
+    '''
+    protocol_version = 'HTTP/1.1'
+    #Send each response part right away, as the mock Discovery service does
+    disable_nagle_algorithm = True
+    config = MockSolrConfig()
+    collections = {}
+
+    def log_message(self, format, *args):
+        LOGGER.debug(format % args)
+
+    def send_body(self, status_code, body, content_type='application/json'):
+        body = body.encode('utf8')
+        self.send_response(status_code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def get_collection(self, path):
+        path_parts = [part for part in path.split('/') if part]
+        if len(path_parts) < 2 or path_parts[-1] not in ('select', 'update'):
+            return None, None
+        return self.collections.setdefault(path_parts[-2], MockSolrCollection()), path_parts[-1]
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        collection, handler = self.get_collection(url.path)
+        if handler != 'select':
+            self.send_body(404, json.dumps({'error': {'msg': 'Not found', 'code': 404}}))
+            return
+        self.select(collection, parse_qs(url.query))
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode('utf8')
+        collection, handler = self.get_collection(url.path)
+        if handler == 'select':
+            self.select(collection, parse_qs(body))
+        elif handler == 'update':
+            self.update(collection, parse_qs(url.query), body)
+        else:
+            self.send_body(404, json.dumps({'error': {'msg': 'Not found', 'code': 404}}))
+
+    def update(self, collection, params, body):
+        self.config.count('updates')
+        if self.config.latency:
+            time.sleep(self.config.latency)
+        if random.random() < self.config.error_probability:
+            self.config.count('errors')
+            self.send_body(500, json.dumps({'error': {'msg': 'Mock indexing failure', 'code': 500}}))
+            return
+        if body.lstrip().startswith('<commit'):
+            self.config.count('commits')
+        elif body.strip():
+            docs = json.loads(body)
+            if not all('id' in doc for doc in docs):
+                self.send_body(400, json.dumps({'error': {'msg': 'Document is missing mandatory uniqueKey field: id', 'code': 400}}))
+                return
+            if self.config.index_time_per_doc:
+                time.sleep(self.config.index_time_per_doc * len(docs))
+            collection.add(docs)
+            self.config.count('documents_added', len(docs))
+        if params.get('commit', ['false'])[0] == 'true':
+            self.config.count('commits')
+        self.send_body(200, json.dumps({'responseHeader': {'status': 0, 'QTime': 0}}))
+
+    def select(self, collection, params):
+        self.config.count('selects')
+        if self.config.latency:
+            time.sleep(self.config.latency)
+        filter_queries = params.get('fq', [])
+        rows = int(params.get('rows', [DEFAULT_ROWS])[0])
+        start = int(params.get('start', ['0'])[0])
+        sort_field, sort_direction = params.get('sort', ['id asc'])[0].split()
+        cursor_mark = params.get('cursorMark', [None])[0]
+        documents = collection.documents
+        response = {'responseHeader': {'status': 0, 'QTime': 0}}
+
+        id_lower_bound = get_id_lower_bound(filter_queries)
+        if cursor_mark is not None or (sort_field == 'id' and sort_direction == 'asc' and start == 0 and id_lower_bound is not None):
+            sorted_ids = collection.get_sorted_ids()
+            if cursor_mark is not None and cursor_mark != '*':
+                position = bisect.bisect_right(sorted_ids, base64.b64decode(cursor_mark).decode('utf8'))
+            else:
+                position = 0 if id_lower_bound is None else bisect.bisect_right(sorted_ids, id_lower_bound)
+            page = []
+            while position < len(sorted_ids) and len(page) < rows:
+                doc = documents.get(sorted_ids[position])
+                if doc is not None and all(matches_filter(doc, filter_query) for filter_query in filter_queries):
+                    page.append(doc)
+                position += 1
+            #The total hit count is not computed for cursor pages, the collection size is returned instead
+            num_found = len(documents)
+            if cursor_mark is not None:
+                response['nextCursorMark'] = base64.b64encode(str(page[-1]['id']).encode('utf8')).decode('utf8') if page else cursor_mark
+        else:
+            docs = [doc for doc in documents.values() if all(matches_filter(doc, filter_query) for filter_query in filter_queries)]
+            docs.sort(key=lambda doc: (doc.get(sort_field) is None, doc.get(sort_field)), reverse=sort_direction == 'desc')
+            num_found = len(docs)
+            page = docs[start:start + rows]
+
+        field_list = params.get('fl', [None])[0]
+        field_names = field_list.split(',') if field_list else None
+        if field_names:
+            page = [{field_name: doc[field_name] for field_name in field_names if field_name in doc} for doc in page]
+        if params.get('wt', ['json'])[0] == 'csv':
+            self.send_body(200, write_csv_documents(page, field_names), 'text/csv; charset=utf-8')
+            return
+        response['response'] = {'numFound': num_found, 'start': start, 'docs': page}
+        self.send_body(200, json.dumps(response))
+
+def start_mock_service(config, port=DEFAULT_PORT, host='127.0.0.1'):
+    '''
+    Starts the mock service in a background thread and returns the server (call shutdown() to stop it). The collections
+    are available on the server as server.collections.
+    '''
+    handler_class = type('ConfiguredMockSolrHandler', (MockSolrHandler,), {'config': config, 'collections': {}})
+    server = ThreadingHTTPServer((host, port), handler_class)
+    server.daemon_threads = True
+    server.collections = handler_class.collections
+    server_thread = threading.Thread(target=server.serve_forever, name='mock_solr', daemon=True)
+    server_thread.start()
+    LOGGER.info('start_mock_service  -  Mock Solr service listening on http://%s:%d' % (host, server.server_address[1]))
+    return server
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog="python %s)" % os.path.basename(__file__), description='Local mock of the Solr select and update handlers for benchmarks')
+    parser.add_argument('-port', dest='port', type=int, default=DEFAULT_PORT, help='Port to listen on')
+    parser.add_argument('-latency', dest='latency', type=float, default=0.01, help='Response latency in seconds')
+    parser.add_argument('-index-time', dest='index_time_per_doc', type=float, default=0.0, help='Seconds spent indexing each added document')
+    parser.add_argument('-error-probability', dest='error_probability', type=float, default=0.0, help='Probability of an update failing with 500')
+    parser.add_argument('-debug', dest="log_level", help="Set DEBUG logging level", action="store_const",
+                        const=logging.DEBUG, default=logging.INFO)
+    args = parser.parse_args()
+
+    common.initialize_logger(args.log_level, LOGGER.name)
+    mock_config = MockSolrConfig(latency=args.latency, index_time_per_doc=args.index_time_per_doc, error_probability=args.error_probability)
+    mock_server = start_mock_service(mock_config, port=args.port)
+    try:
+        while True:
+            time.sleep(10)
+            LOGGER.info('Mock service statistics [%s]' % json.dumps(mock_config.stats))
+    except KeyboardInterrupt:
+        mock_server.shutdown()
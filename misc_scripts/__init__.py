@@ -0,0 +1,17 @@
+'''
+Discovery upload, Solr backup and restore, and conversation workspace tools, run with python -m misc_scripts <command>.
+
+The same commands can be run in-process with misc_scripts.main([command, option, ...]), or through the drivers of the
+tool modules (discovery_upload, solr_backup, conversation_workspace_parser), imported on first use.
+'''
+import importlib
+
+from .cli import main
+
+__all__ = ['main']
+TOOL_MODULES = ('common', 'discovery_upload', 'solr_backup', 'conversation_workspace_parser')
+
+def __getattr__(name):
+    if name in TOOL_MODULES:
+        return importlib.import_module('.' + name, __name__)
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
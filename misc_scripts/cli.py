@@ -0,0 +1,34 @@
+import sys
+import argparse
+import importlib
+
+#command: (tool module, description). Tool modules are only imported by their own commands, so each invocation only
+#pays for the dependencies it uses (requests for upload, pysolr for backup and restore, multiprocessing for batch extract)
+COMMANDS = {
+    'upload': ('discovery_upload', 'Upload documents to Discovery collections'),
+    'backup': ('solr_backup', 'Back up a Solr collection to files'),
+    'restore': ('solr_backup', 'Restore backup files into a Solr collection'),
+    'lookup': ('solr_backup', 'Print documents by id from backup files'),
+    'extract': ('conversation_workspace_parser', 'Extract conversation workspace sections to CSV files'),
+}
+
+def get_command_module(command):
+    return importlib.import_module('.' + COMMANDS[command][0], __package__)
+
+def main(argv=None):
+    '''
+    Runs a command in this process: main(['restore', '-creds-file', 'creds.json', ...]) behaves like the command line
+    and returns the result of the command instead of exiting. Invalid options raise SystemExit, like argparse does.
+    '''
+    parser = argparse.ArgumentParser(prog="python -m %s" % __package__, description='Discovery upload, Solr backup and restore, and conversation workspace tools',
+                                     epilog='commands:\n' + '\n'.join('  %-10s %s' % (command, description) for command, (_, description) in COMMANDS.items()),
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=COMMANDS, metavar='command', help='Command to run (see commands below)')
+    parser.add_argument('arguments', nargs=argparse.REMAINDER, help='Options of the command (see: command -h)')
+    args = parser.parse_args(argv)
+    return get_command_module(args.command).main(args.arguments, args.command)
+
+def run():
+    if sys.version_info[0] < 3:
+        raise Exception("Python 3 or higher version is required for this script.")
+    main()
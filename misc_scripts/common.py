@@ -0,0 +1,145 @@
+import os
+import sys
+import json
+import logging
+
+LOGGER_NAME = 'misc_scripts'
+JSON_READ_CHUNK_SIZE = 65536
+JSON_WHITESPACE = ' \t\r\n'
+JSON_NUMBER_CHARACTERS = '0123456789.eE+-'
+#Growth of the read size while a document does not fit in the buffer, each failed decode parses the whole buffer again
+JSON_READ_GROWTH = 4
+LOGGER = logging.getLogger(__name__)
+#Parsed credentials files by absolute path: (modification time, credentials)
+CREDENTIALS_CACHE = {}
+
+def initialize_logger(log_level, name=LOGGER_NAME):
+    '''
+    Configures the logger of the package (by default), which the loggers of every tool module propagate to.
+    '''
+    logger = logging.getLogger(name)
+    logger.setLevel(log_level)
+    if not logger.handlers:
+        ch = logging.StreamHandler(sys.stdout)
+        ch.setLevel(log_level)
+        formatter = logging.Formatter('%(asctime)s %(levelname)s %(name)s : %(message)s')
+        ch.setFormatter(formatter)
+        logger.addHandler(ch)
+    for handler in logger.handlers:
+        handler.setLevel(log_level)
+    return logger
+
+def load_creds_file(credentials_file_path):
+    '''
+    Loads a credentials file once per process: the parsed file is cached by path and only read again when its
+    modification time changes, so that the clients created by every thread, partition or in-process job share it.
+    '''
+    file_path = os.path.abspath(credentials_file_path)
+    file_mtime = os.stat(file_path).st_mtime_ns
+    cached_creds = CREDENTIALS_CACHE.get(file_path)
+    if cached_creds is not None and cached_creds[0] == file_mtime:
+        return cached_creds[1]
+    with open(file_path) as user_creds_file:
+        try:
+            all_creds = json.load(user_creds_file)
+        except ValueError as ex:
+            LOGGER.error('load_creds_file  -  Credentials file not valid: %s' % str(ex))
+            raise ValueError('Unable to parse credentials file: %s' % str(ex))
+    CREDENTIALS_CACHE[file_path] = (file_mtime, all_creds)
+    return all_creds
+
+def parse_creds_file(credentials_file_path, key_name):
+    '''
+    Parses the service credentials (Discovery or R&R) from a json file. Expects them in the following format:
+    {
+        "discovery_instance_1": {
+            "url": "https://gateway.watsonplatform.net/discovery/api",
+            "username": "username",
+            "password": "password"
+        },
+        "rnr_instance_1": {
+            "url": "https://gateway.watsonplatform.net/retrieve-and-rank/api",
+            "username": "username",
+            "password": "password"
+        }
+    }
+    '''
+    all_creds = load_creds_file(credentials_file_path)
+    try:
+        credentials = all_creds[key_name]
+        LOGGER.debug('parse_creds_file  -  Credentials loaded for key [%s]' % key_name)
+        return credentials['url'], credentials['username'], credentials['password']
+    except KeyError as ke:
+        LOGGER.error('parse_creds_file  -  Expected keys do not exist: %s' % str(ke))
+        raise ke
+
+def iter_json_documents(json_file, chunk_size=JSON_READ_CHUNK_SIZE):
+    '''
+    Incrementally parses an open JSON file, yielding one document at a time without loading the whole file into
+    memory. Supports a top level JSON array (each element is yielded) and newline delimited JSON / concatenated
+    JSON values (each value is yielded). Only the current read chunk and the document being decoded are buffered.
+    A document that does not fit in the buffer is decoded again after each read, so the read size grows geometrically
+    (JSON_READ_GROWTH) after every failed decode: decoding a document of n bytes costs O(n) instead of O(n^2 / chunk_size).
+    '''
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    eof = False
+    in_array = None
+    expect_separator = False
+    read_size = chunk_size
+    while True:
+        while position < len(buffer) and buffer[position] in JSON_WHITESPACE:
+            position += 1
+        if position >= len(buffer):
+            if eof:
+                if in_array:
+                    raise ValueError('Unexpected end of file, JSON array is not closed')
+                return
+            chunk = json_file.read(chunk_size)
+            if not chunk:
+                eof = True
+            buffer = buffer[position:] + chunk
+            position = 0
+            if in_array is None:
+                buffer = buffer.lstrip('\ufeff')
+            continue
+
+        char = buffer[position]
+        if in_array is None:
+            in_array = char == '['
+            if in_array:
+                position += 1
+                continue
+        if in_array:
+            if char == ']':
+                return
+            if expect_separator:
+                if char != ',':
+                    raise ValueError('Expected "," between JSON array elements, found [%s]' % char)
+                position += 1
+                expect_separator = False
+                continue
+
+        try:
+            value, end = decoder.raw_decode(buffer, position)
+        except ValueError:
+            if eof:
+                raise
+            value, end = None, None
+        if end is None or (not eof and isinstance(value, (int, float)) and not isinstance(value, bool) and not buffer[end:].lstrip(JSON_NUMBER_CHARACTERS)):
+            # Document spans past the current buffer, or is a number that may go on in the next read (3 of 3.25), read more
+            # and decode again. Objects, arrays, strings and literals end with their last character and are never decoded twice.
+            chunk = json_file.read(read_size)
+            read_size *= JSON_READ_GROWTH
+            if not chunk:
+                eof = True
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+
+        position = end
+        read_size = chunk_size
+        expect_separator = in_array
+        yield value
+
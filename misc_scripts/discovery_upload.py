@@ -0,0 +1,1504 @@
+import os
+import requests
+import json
+import logging
+import time
+import argparse
+import ntpath
+import threading
+import itertools
+import hashlib
+import queue
+import io
+import uuid
+import mimetypes
+import bisect
+import random
+
+from concurrent.futures import ThreadPoolExecutor, wait, as_completed, FIRST_COMPLETED
+from requests.adapters import HTTPAdapter
+from collections import defaultdict, namedtuple, deque
+from email.utils import parsedate_to_datetime
+
+from .common import initialize_logger, parse_creds_file, iter_json_documents, JSON_READ_CHUNK_SIZE, JSON_WHITESPACE
+
+WDS_API_VERSION = '2018-03-05'
+WDS_SUPPORTED_FILE_TYPES = ('.json', '.jsonl', '.ndjson', '.pdf','.html', '.doc', '.docx')
+JSON_FILE_TYPES = ('.json', '.jsonl', '.ndjson')
+DOC_UPLOAD_DEFAULT_STATUS = "Unknown"
+MAX_NUMBER_THREADS = 2#8
+MAX_IN_FLIGHT_UPLOADS = 4 * MAX_NUMBER_THREADS
+OUTPUT_INTERVAL = 1000
+FILE_PIPELINE_THREADS = 4
+UPLOAD_ENGINE_THREADS = 'threads'
+UPLOAD_ENGINE_ASYNCIO = 'asyncio'
+RETRY_SLEEP_TIME = 0.25
+RETRY_MAX_SLEEP_TIME = 30.0
+MAX_UPLOAD_RETRIES = 8
+RETRY_STATUS_CODES = (429, 503)
+INITIAL_REQUEST_RATE = 10.0
+MIN_REQUEST_RATE = 0.5
+MAX_REQUEST_RATE = 500.0
+RATE_INCREASE_STEP = 5.0
+RATE_DECREASE_FACTOR = 0.5
+RATE_DECREASE_INTERVAL = 1.0
+RETRY_FILE_NAMES = 'discovery_retry.log'
+INGEST_FILE_EXTENSION = '_discovery_ingestion.log'
+FAILED_FILE_EXTENSION = '_failed.ndjson'
+OUTPUT_FLUSH_INTERVAL = 2.0
+OUTPUT_QUEUE_SIZE = 10000
+JOURNAL_FILE_NAME = 'discovery_journal.log'
+JOURNAL_WHOLE_FILE_KEY = ''
+MANIFEST_COMMIT_INTERVAL = 1000
+METRICS_FILE_NAME = 'discovery_metrics.jsonl'
+METRICS_SNAPSHOT_INTERVAL = 10.0
+METRICS_WINDOW_SECONDS = 60
+LATENCY_BUCKETS = [0.001 * (1.25 ** i) for i in range(54)]
+DOC_FAILED_STATE = 'failed'
+DOC_FINAL_STATES = ('available', 'available with notices', DOC_FAILED_STATE)
+STATUS_POLL_INTERVAL = 5.0
+STATUS_POLL_MAX_INTERVAL = 120.0
+STATUS_POLL_BACKOFF_FACTOR = 2.0
+STATUS_POLL_TIMEOUT = 3600.0
+
+DocumentRef = namedtuple('DocumentRef', ['key', 'content_hash', 'manifest_key'])
+FILE_HASH_CHUNK_SIZE = 1048576
+UPLOAD_CHUNK_SIZE = 65536
+DEFAULT_MIME_TYPE = 'application/octet-stream'
+FILE_SIGNATURE_MIME_TYPES = ((b'%PDF-', 'application/pdf'), (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'application/msword'))
+EXTENSION_MIME_TYPES = {
+    '.pdf': 'application/pdf',
+    '.doc': 'application/msword',
+    '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    '.html': 'text/html',
+}
+
+LOGGER = logging.getLogger(__name__)
+
+def peek_json_start(json_file):
+    '''
+    Returns the first non whitespace character of an open JSON file (or None if the file is empty) and rewinds the
+    file so that it can be parsed from the beginning.
+    '''
+    first_char = None
+    while True:
+        chunk = json_file.read(JSON_READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        stripped = chunk.lstrip(JSON_WHITESPACE + '\ufeff')
+        if stripped:
+            first_char = stripped[0]
+            break
+    json_file.seek(0)
+    return first_char
+
+def parse_retry_after(response):
+    '''
+    Returns the number of seconds requested by a Retry-After response header (either delta seconds or an HTTP date),
+    or None if the header is missing or not valid.
+    '''
+    retry_after = response.headers.get('Retry-After')
+    if not retry_after:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        retry_date = parsedate_to_datetime(retry_after)
+        return max(0.0, retry_date.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def get_retry_sleep_time(attempt, retry_after=None):
+    '''
+    Capped exponential backoff with full jitter for the given retry attempt (starting at 0). A Retry-After value
+    returned by the service is used as the lower bound.
+    '''
+    backoff = random.uniform(0, min(RETRY_MAX_SLEEP_TIME, RETRY_SLEEP_TIME * (2 ** attempt)))
+    if retry_after is not None:
+        backoff = max(backoff, min(retry_after, RETRY_MAX_SLEEP_TIME))
+    return backoff
+
+def detect_mime_type(file_path):
+    '''
+    Detects the MIME type of a document from its leading bytes (PDF and legacy Word signatures) and falls back on the
+    file extension. Returns application/octet-stream if the type is unknown.
+    '''
+    with open(file_path, 'rb') as sniffed_file:
+        leading_bytes = sniffed_file.read(16)
+    for signature, mime_type in FILE_SIGNATURE_MIME_TYPES:
+        if leading_bytes.startswith(signature):
+            return mime_type
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension in EXTENSION_MIME_TYPES:
+        return EXTENSION_MIME_TYPES[extension]
+    guessed_type, _ = mimetypes.guess_type(file_path)
+    return guessed_type if guessed_type else DEFAULT_MIME_TYPE
+
+def upload_file(disco_instance, document_id, file_tuple):
+    ''' 
+    Attempts to upload a file tuple to Discovery using REST API (tuple includes the file name, the file content, and file content type). 
+    When the content is a binary file object, it is streamed in chunks as the multipart body instead of being loaded in memory. Requests go through the pooled keep-alive session of the Discovery instance and are paced by the rate controller shared through the Discovery instance. Throttled requests (HTTP 429 / 503) are retried up
+    to MAX_UPLOAD_RETRIES times with capped exponential backoff and jitter, honoring Retry-After. Returns a response with following format"
+    {
+        "success": True / False
+        "response_code": HTTP response code
+        "doc_id" : "The uploaded document Id, or None if error/exception"
+        "doc_state" : "The document upload state or Unknown if error/exception"
+    }, original_file_tuple_input
+    '''
+    d_status = DOC_UPLOAD_DEFAULT_STATUS
+    if document_id is not None:
+        discovery_url = disco_instance.url + '/v1/environments/{0}/collections/{1}/documents/{2}?version={3}'.format(disco_instance.env_id, disco_instance.col_id, document_id, WDS_API_VERSION)
+    else: 
+        discovery_url = disco_instance.url + '/v1/environments/{0}/collections/{1}/documents?version={2}'.format(disco_instance.env_id, disco_instance.col_id, WDS_API_VERSION)
+    session = disco_instance.get_session()
+    rate_controller = disco_instance.rate_controller
+
+    try:
+        attempt = 0
+        while True:
+            if hasattr(file_tuple[1], 'seek'):
+                file_tuple[1].seek(0)
+            rate_controller.acquire()
+            LOGGER.debug('upload_file  -  [%s] Upload request started (attempt %d). Upload URL [%s] || File metadata filename: [%s] || mime_type: [%s]' % (threading.current_thread().name, attempt + 1, discovery_url, file_tuple[0], file_tuple[2]))
+            request_start_time = time.monotonic()
+            if hasattr(file_tuple[1], 'read'):
+                multipart_body = MultipartFileStream('file', file_tuple[0], file_tuple[1], file_tuple[2])
+                request_bytes = len(multipart_body)
+                response = session.post(discovery_url, data=multipart_body, headers={'Content-Type': multipart_body.content_type})
+            else:
+                request_bytes = len(file_tuple[1])
+                response = session.post(discovery_url, files={'file': file_tuple})
+            if disco_instance.metrics is not None:
+                disco_instance.metrics.record_request(time.monotonic() - request_start_time, response.status_code, request_bytes, attempt)
+            LOGGER.debug('upload_file  -  [%s] Upload response code: [%d]. Content: [%s]' % (threading.current_thread().name, response.status_code, response.text.replace("\r\n", "").replace("\n","")))
+
+            if response.status_code not in RETRY_STATUS_CODES:
+                break
+            retry_after = parse_retry_after(response)
+            rate_controller.on_throttled(retry_after)
+            if attempt >= MAX_UPLOAD_RETRIES:
+                break
+            rate_controller.on_retry()
+            time.sleep(get_retry_sleep_time(attempt, retry_after))
+            attempt += 1
+
+        if 200 <= response.status_code <= 299:
+            rate_controller.on_success()
+            response_json = response.json()
+            if 'status' in response_json and response_json['status']  == 'ERROR':
+                return {'success': False, 'response_code':str(response.status_code), 'doc_id': document_id, 'doc_state': d_status }, file_tuple
+            return {'success': True, 'response_code':str(response.status_code), 'doc_id': response_json['document_id'], 'doc_state': response_json['status'] }, None
+        else:
+            return {'success': False, 'response_code':str(response.status_code), 'doc_id': document_id, 'doc_state': d_status }, file_tuple
+    except Exception as e:
+        msg = 'Exception occured'
+        if hasattr(e, 'reason'):
+            msg = msg + '. Reason: ' + str(e.reason)
+        elif hasattr(e, 'code'): 
+            msg = msg + '. Code' + str(e.code)
+        else:
+            msg = msg + '. Message' + str(e)
+        
+        LOGGER.error('upload_file  -  [%s] Upload failure: %s' % (threading.current_thread().name, msg) )
+        return {'success': False, 'response_code': 'Unknown', 'doc_id': document_id, 'doc_state': d_status }, file_tuple
+
+def delete_document(disco_instance, discovery_doc_id):
+    '''
+    Deletes a document from the Discovery collection, paced by the rate controller. Returns True if the document was
+    deleted (or no longer exists).
+    '''
+    discovery_url = disco_instance.url + '/v1/environments/{0}/collections/{1}/documents/{2}?version={3}'.format(disco_instance.env_id, disco_instance.col_id, discovery_doc_id, WDS_API_VERSION)
+    session = disco_instance.get_session()
+    rate_controller = disco_instance.rate_controller
+    try:
+        attempt = 0
+        while True:
+            rate_controller.acquire()
+            response = session.delete(discovery_url)
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= MAX_UPLOAD_RETRIES:
+                break
+            retry_after = parse_retry_after(response)
+            rate_controller.on_throttled(retry_after)
+            rate_controller.on_retry()
+            time.sleep(get_retry_sleep_time(attempt, retry_after))
+            attempt += 1
+        LOGGER.debug('delete_document  -  Delete response code for document [%s]: [%d]' % (discovery_doc_id, response.status_code))
+        return 200 <= response.status_code <= 299 or response.status_code == 404
+    except Exception as e:
+        LOGGER.error('delete_document  -  Delete failure for document [%s]: %s' % (discovery_doc_id, str(e)))
+        return False
+
+def delete_missing_documents(disco_instance, manifest):
+    '''
+    Deletes from Discovery (and from the manifest) the documents that were tracked by the manifest but not seen in the
+    current run. Only meaningful when the run covered the full source corpus.
+    '''
+    missing_docs = manifest.get_missing()
+    LOGGER.info('delete_missing_documents  -  Number of documents no longer in the source: [%d]' % len(missing_docs))
+    delete_stats = defaultdict(int)
+    with ThreadPoolExecutor(max_workers=disco_instance.max_workers) as executor:
+        delete_tasks = {executor.submit(delete_document, disco_instance.get_target(manifest_key), discovery_doc_id): manifest_key for manifest_key, discovery_doc_id in missing_docs if discovery_doc_id}
+        for delete_task in as_completed(delete_tasks):
+            if delete_task.result():
+                manifest.remove(delete_tasks[delete_task])
+                delete_stats['documents_deleted_count'] += 1
+            else:
+                delete_stats['documents_delete_failed_count'] += 1
+    manifest.commit()
+    LOGGER.info('delete_missing_documents  -  Finished deleting documents: Statistics [%s]' % json.dumps(delete_stats))
+    return delete_stats
+
+def get_content_hash(content):
+    if isinstance(content, str):
+        content = content.encode('utf8')
+    return hashlib.sha1(content).hexdigest()
+
+def get_file_hash(file_path):
+    file_hash = hashlib.sha1()
+    with open(file_path, 'rb') as hashed_file:
+        for chunk in iter(lambda: hashed_file.read(FILE_HASH_CHUNK_SIZE), b''):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+def get_document_ref(source_file, document_id, doc_key, content_hash):
+    '''
+    Identifies a document for the resume journal and the delta manifest. Documents with an id are tracked in the manifest
+    by that id, others by their source file path (and array position).
+    '''
+    if document_id is not None:
+        manifest_key = document_id
+    elif doc_key:
+        manifest_key = os.path.abspath(source_file) + '#' + doc_key
+    else:
+        manifest_key = os.path.abspath(source_file)
+    return DocumentRef(doc_key, content_hash, manifest_key)
+
+def check_document_skip(disco_instance, source_file, doc_ref):
+    '''
+    Returns the name of the statistics counter to increment if the document does not need to be uploaded, either
+    because the manifest has the same content hash or because the resume journal marks it as uploaded. The manifest is
+    checked first so that every document of the run is stamped as seen. Returns None
+    if the document has to be uploaded.
+    '''
+    if disco_instance.manifest is not None and disco_instance.manifest.is_unchanged(doc_ref.manifest_key, doc_ref.content_hash):
+        return 'documents_unchanged_count'
+    if disco_instance.journal is not None and disco_instance.journal.is_completed(source_file, doc_ref.key, doc_ref.content_hash):
+        return 'documents_skipped_count'
+    return None
+
+def get_upload_document_id(disco_instance, document_id, doc_ref):
+    '''
+    Documents without an id get their Discovery document_id from the manifest once uploaded, so that a changed version
+    updates that document instead of creating a second one (which -delete-missing could no longer find).
+    '''
+    if document_id is None and disco_instance.manifest is not None:
+        return disco_instance.manifest.get_discovery_id(doc_ref.manifest_key)
+    return document_id
+
+def record_document_checkpoint(disco_instance, source_file, doc_ref, upload_res):
+    if disco_instance.metrics is not None:
+        disco_instance.metrics.document_completed(upload_res['success'])
+    if disco_instance.journal is not None:
+        disco_instance.journal.record(source_file, doc_ref, upload_res)
+    if disco_instance.manifest is not None and upload_res['success']:
+        disco_instance.manifest.update(doc_ref.manifest_key, doc_ref.content_hash, upload_res['doc_id'])
+
+def prepare_json_document(json_file_path, doc, doc_number):
+    '''
+    Builds the upload file tuple for a single document from a JSON array. The id field (if any) becomes the Discovery
+    document id and is removed from the uploaded content. Returns the document id (or None) and the file tuple.
+    '''
+    document_id = doc['id'] if 'id' in doc else None
+    file_name = (doc['id'] + '.json') if 'id' in doc else (os.path.splitext(ntpath.basename(json_file_path))[0] + '_' + str(doc_number) + '.json')
+
+    doc.pop("id", None) #Remove id from document so that no notices are generated.
+    return document_id, (file_name, json.dumps(doc), 'application/json')
+
+def record_json_upload_result(disco_instance, json_file_path, doc_ref, upload_res, input_data, process_jsonarray_stats, response_code_stats, output_writer):
+    '''
+    Accumulates the result of uploading a single JSON array document into the statistics of its file, streams the result
+    line and failed document to the output writer, and checkpoints it in the journal and manifest (if any). Shared by the
+    thread and asyncio upload engines.
+    '''
+    record_document_checkpoint(disco_instance, json_file_path, doc_ref, upload_res)
+    response_code_stats[upload_res['response_code']] += 1
+    if upload_res['success']:
+        output_writer.write_result(upload_res['doc_id'] + ' | ' + str(upload_res['success']) + ' | ' + upload_res['doc_state'] )
+        process_jsonarray_stats['documents_successful_upload_count'] += 1
+    else:
+        process_jsonarray_stats['documents_failed_upload_count'] += 1
+        if input_data is not None:
+            # Reinject document_id for failed documents. Only do this for json array since I'm writing
+            # just the failed docs to a new file, instead of retrying the entire file with all json docs.
+            if upload_res['doc_id'] is not None:
+                output_writer.write_result(upload_res['doc_id'] + ' | ' + str(upload_res['success']) + ' | ' + upload_res['doc_state'] )
+                output_writer.write_failed(input_data[1], upload_res['doc_id'])
+            else:
+                output_writer.write_result(input_data[0] + ' | ' + str(upload_res['success']) + ' | ' + upload_res['doc_state'] )
+                output_writer.write_failed(input_data[1])
+        else:
+            LOGGER.error('process_json_array  -  Document upload failed but no input captured for retry. Original file name [%s]' % json_file_path)
+
+def process_json_array(disco_instance, json_file_path, json_data, output_writer):
+    '''
+    Special case, handles processing of a file with JSON array content which is iterated and uploaded to Discovery (each object in the array becomes a document
+    in Discovery). The json_data can be any iterable of documents, including the incremental parser from iter_json_documents. Uses 
+    threads to upload objects in the JSON array, keeping at most disco_instance.max_in_flight uploads submitted at a time. When the window
+    is full, submission blocks until an upload completes, so results are consumed as they finish and their payloads released right away. 
+    Each document is routed to its Discovery target (a single instance, or one of the shards) and submitted to that target's
+    upload pool, which is shared across files. Document results and failed documents are streamed to the output_writer as uploads complete. Returns a response with following format:
+    {
+        "documents_processed_count": # of documents in json array
+        "documents_successful_upload_count" : # of documents that successfully uploaded
+        "documents_failed_upload_count" : # of documents that failed to upload (and can be retried with stored input data)
+    }, response_code_stats
+    '''
+    LOGGER.info('process_json_array  -  JSON file processing started [%s]' % json_file_path)
+    process_jsonarray_stats = defaultdict(int)
+    response_code_stats = defaultdict(int)
+
+    def record_upload_result(upload_task, doc_ref):
+        upload_res, input_data = upload_task.result()
+        record_json_upload_result(disco_instance, json_file_path, doc_ref, upload_res, input_data, process_jsonarray_stats, response_code_stats, output_writer)
+
+    in_flight_tasks = {}
+    for doc in json_data:
+        process_jsonarray_stats['documents_processed_count'] += 1
+        document_id, file_tuple = prepare_json_document(json_file_path, doc, process_jsonarray_stats['documents_processed_count'])
+        doc_key = document_id if document_id is not None else str(process_jsonarray_stats['documents_processed_count'])
+        doc_ref = get_document_ref(json_file_path, document_id, doc_key, get_content_hash(file_tuple[1]))
+        skip_reason = check_document_skip(disco_instance, json_file_path, doc_ref)
+        if skip_reason:
+            process_jsonarray_stats[skip_reason] += 1
+            continue
+        if disco_instance.metrics is not None:
+            disco_instance.metrics.document_submitted()
+        target_instance = disco_instance.get_target(doc_ref.manifest_key)
+        document_id = get_upload_document_id(disco_instance, document_id, doc_ref)
+        in_flight_tasks[target_instance.get_executor().submit(upload_file, target_instance, document_id, file_tuple)] = doc_ref
+
+        if len(in_flight_tasks) >= disco_instance.max_in_flight:
+            completed_tasks, _ = wait(in_flight_tasks, return_when=FIRST_COMPLETED)
+            for upload_task in completed_tasks:
+                record_upload_result(upload_task, in_flight_tasks.pop(upload_task))
+
+        if process_jsonarray_stats['documents_processed_count'] % OUTPUT_INTERVAL == 0:
+            LOGGER.info('process_json_array  -  JSON documents upload submitted. Current status: [%s]' % json.dumps(process_jsonarray_stats))
+
+    for upload_task in as_completed(in_flight_tasks):
+        record_upload_result(upload_task, in_flight_tasks[upload_task])
+    
+    LOGGER.info('process_json_array  -  Finished processing JSON file: Statistics [%s]' % json.dumps(process_jsonarray_stats))
+    return process_jsonarray_stats, response_code_stats
+
+async def upload_file_async(disco_instance, http_session, document_id, file_tuple):
+    '''
+    asyncio version of upload_file, using an aiohttp client session. Applies the same rate control, retry and backoff
+    rules and returns the same response format.
+    '''
+    import asyncio
+    import aiohttp
+
+    d_status = DOC_UPLOAD_DEFAULT_STATUS
+    if document_id is not None:
+        discovery_url = disco_instance.url + '/v1/environments/{0}/collections/{1}/documents/{2}?version={3}'.format(disco_instance.env_id, disco_instance.col_id, document_id, WDS_API_VERSION)
+    else: 
+        discovery_url = disco_instance.url + '/v1/environments/{0}/collections/{1}/documents?version={2}'.format(disco_instance.env_id, disco_instance.col_id, WDS_API_VERSION)
+    rate_controller = disco_instance.rate_controller
+
+    try:
+        attempt = 0
+        while True:
+            if hasattr(file_tuple[1], 'seek'):
+                file_tuple[1].seek(0)
+            form_data = aiohttp.FormData()
+            form_data.add_field('file', file_tuple[1], filename=file_tuple[0], content_type=file_tuple[2])
+            await rate_controller.acquire_async()
+            LOGGER.debug('upload_file_async  -  Upload request started (attempt %d). Upload URL [%s] || File metadata filename: [%s] || mime_type: [%s]' % (attempt + 1, discovery_url, file_tuple[0], file_tuple[2]))
+            request_start_time = time.monotonic()
+            async with http_session.post(discovery_url, data=form_data) as response:
+                response_text = await response.text()
+                if disco_instance.metrics is not None:
+                    disco_instance.metrics.record_request(time.monotonic() - request_start_time, response.status, len(file_tuple[1]), attempt)
+                LOGGER.debug('upload_file_async  -  Upload response code: [%d]. Content: [%s]' % (response.status, response_text.replace("\r\n", "").replace("\n","")))
+                if response.status not in RETRY_STATUS_CODES:
+                    break
+                retry_after = parse_retry_after(response)
+            rate_controller.on_throttled(retry_after)
+            if attempt >= MAX_UPLOAD_RETRIES:
+                break
+            rate_controller.on_retry()
+            await asyncio.sleep(get_retry_sleep_time(attempt, retry_after))
+            attempt += 1
+
+        if 200 <= response.status <= 299:
+            rate_controller.on_success()
+            response_json = json.loads(response_text)
+            if 'status' in response_json and response_json['status']  == 'ERROR':
+                return {'success': False, 'response_code':str(response.status), 'doc_id': document_id, 'doc_state': d_status }, file_tuple
+            return {'success': True, 'response_code':str(response.status), 'doc_id': response_json['document_id'], 'doc_state': response_json['status'] }, None
+        else:
+            return {'success': False, 'response_code':str(response.status), 'doc_id': document_id, 'doc_state': d_status }, file_tuple
+    except Exception as e:
+        LOGGER.error('upload_file_async  -  Upload failure: Exception occured. Message %s' % repr(e))
+        return {'success': False, 'response_code': 'Unknown', 'doc_id': document_id, 'doc_state': d_status }, file_tuple
+
+async def process_json_array_async(disco_instance, json_file_path, json_data, output_writer):
+    '''
+    asyncio upload engine for a JSON array, an alternative to the thread pool used by process_json_array. A single event
+    loop keeps up to disco_instance.max_in_flight uploads running concurrently over one aiohttp connection pool per target, so
+    concurrency is bounded by the service quota rather than the number of OS threads. Returns the same statistics and streams
+    the same results and failed documents as process_json_array. Requires the aiohttp package.
+    '''
+    import asyncio
+    import aiohttp
+
+    LOGGER.info('process_json_array_async  -  JSON file processing started [%s]' % json_file_path)
+    process_jsonarray_stats = defaultdict(int)
+    response_code_stats = defaultdict(int)
+
+    def record_upload_result(upload_task, doc_ref):
+        upload_res, input_data = upload_task.result()
+        record_json_upload_result(disco_instance, json_file_path, doc_ref, upload_res, input_data, process_jsonarray_stats, response_code_stats, output_writer)
+
+    http_sessions = {}
+    def get_http_session(target_instance):
+        if target_instance not in http_sessions:
+            connector = aiohttp.TCPConnector(limit=target_instance.max_in_flight)
+            auth = aiohttp.BasicAuth(target_instance.uname, target_instance.pwd)
+            http_sessions[target_instance] = aiohttp.ClientSession(connector=connector, auth=auth, headers={'accept': 'application/json'})
+        return http_sessions[target_instance]
+
+    try:
+        in_flight_tasks = {}
+        for doc in json_data:
+            process_jsonarray_stats['documents_processed_count'] += 1
+            document_id, file_tuple = prepare_json_document(json_file_path, doc, process_jsonarray_stats['documents_processed_count'])
+            doc_key = document_id if document_id is not None else str(process_jsonarray_stats['documents_processed_count'])
+            doc_ref = get_document_ref(json_file_path, document_id, doc_key, get_content_hash(file_tuple[1]))
+            skip_reason = check_document_skip(disco_instance, json_file_path, doc_ref)
+            if skip_reason:
+                process_jsonarray_stats[skip_reason] += 1
+                continue
+            if disco_instance.metrics is not None:
+                disco_instance.metrics.document_submitted()
+            target_instance = disco_instance.get_target(doc_ref.manifest_key)
+            document_id = get_upload_document_id(disco_instance, document_id, doc_ref)
+            in_flight_tasks[asyncio.ensure_future(upload_file_async(target_instance, get_http_session(target_instance), document_id, file_tuple))] = doc_ref
+
+            if len(in_flight_tasks) >= disco_instance.max_in_flight:
+                completed_tasks, _ = await asyncio.wait(in_flight_tasks, return_when=asyncio.FIRST_COMPLETED)
+                for upload_task in completed_tasks:
+                    record_upload_result(upload_task, in_flight_tasks.pop(upload_task))
+
+            if process_jsonarray_stats['documents_processed_count'] % OUTPUT_INTERVAL == 0:
+                LOGGER.info('process_json_array_async  -  JSON documents upload submitted. Current status: [%s]' % json.dumps(process_jsonarray_stats))
+
+        if in_flight_tasks:
+            completed_tasks, _ = await asyncio.wait(in_flight_tasks)
+            for upload_task in completed_tasks:
+                record_upload_result(upload_task, in_flight_tasks[upload_task])
+    finally:
+        for http_session in http_sessions.values():
+            await http_session.close()
+
+    LOGGER.info('process_json_array_async  -  Finished processing JSON file: Statistics [%s]' % json.dumps(process_jsonarray_stats))
+    return process_jsonarray_stats, response_code_stats
+
+def run_json_array_upload(disco_instance, json_file_path, json_data, output_writer):
+    '''
+    Uploads the documents of a JSON array with the upload engine selected for the Discovery instance.
+    '''
+    if disco_instance.upload_engine == UPLOAD_ENGINE_ASYNCIO:
+        #asyncio is only imported by the asyncio engine
+        import asyncio
+        return asyncio.run(process_json_array_async(disco_instance, json_file_path, json_data, output_writer))
+    return process_json_array(disco_instance, json_file_path, json_data, output_writer)
+
+def process_file(disco_instance, input_file, output_directory, input_root=None):
+    '''
+    Handles processing of a file to upload into discovery. Streams results of uploading each file into a log file, and
+    failed JSON array documents into a NDJSON file, while the uploads progress.
+    Returns the number of files that were attempted to upload, the number of files that were successfully uploaded, and
+    the name of file that has any documents that need to be retried. All uploads run on the upload pool of the Discovery
+    target the document is routed to, which is shared with the other files being processed.
+    '''
+    def upload_document(document_id, file_tuple, doc_ref):
+        if disco_instance.metrics is not None:
+            disco_instance.metrics.document_submitted()
+        target_instance = disco_instance.get_target(doc_ref.manifest_key)
+        document_id = get_upload_document_id(disco_instance, document_id, doc_ref)
+        upload_result = target_instance.get_executor().submit(upload_file, target_instance, document_id, file_tuple).result()
+        record_document_checkpoint(disco_instance, input_file, doc_ref, upload_result[0])
+        return upload_result
+
+    def is_completed(doc_ref):
+        skip_reason = check_document_skip(disco_instance, input_file, doc_ref)
+        if skip_reason:
+            LOGGER.info('process_file  -  File already ingested or unchanged [%s], skipping - [%s]' % (skip_reason, input_file))
+            return True
+        return False
+
+    LOGGER.info('process_file  -  Single file processing started - [%s]' % input_file)
+    file_process_start_time = time.time()
+    retry_file_name = None 
+    valid_doc_upload_attempt_count = 0
+    valid_doc_upload_success_count = 0
+    response_code_stats = defaultdict(int)
+    if not input_file.lower().endswith(WDS_SUPPORTED_FILE_TYPES) or not os.path.isfile(input_file):
+        LOGGER.debug('process_file  -  Provided file is either not a file or not a supported file type')
+        return valid_doc_upload_attempt_count, valid_doc_upload_success_count, retry_file_name
+
+    log_file_name = get_output_file_name(output_directory, input_file, input_root, INGEST_FILE_EXTENSION)
+    failed_file_name = get_output_file_name(output_directory, input_file, input_root, FAILED_FILE_EXTENSION)
+    LOGGER.info('process_file  -  Streaming ingestion results to log file [%s]' % log_file_name)
+    is_json_file = input_file.lower().endswith(JSON_FILE_TYPES)
+    output_writer = IngestionOutputWriter(log_file_name, failed_file_name)
+    try:
+        with (open(input_file, 'r',  encoding='utf8') if is_json_file else open(input_file, 'rb')) as current_file:
+            if hasattr(current_file, 'name'):
+                file_name = current_file.name
+                if not file_name:
+                    file_name = ntpath.basename(input_file)
+
+            #Special JSON handling. Documents are parsed incrementally so that uploads start right away and memory stays
+            #bounded regardless of the file size.
+            if is_json_file:
+                json_start = peek_json_start(current_file)
+                json_docs = iter_json_documents(current_file)
+                json_data = None
+                json_stream = False
+                if json_start == '[':
+                    json_data = json_docs
+                    json_stream = True
+                elif json_start is not None:
+                    first_doc = next(json_docs, None)
+                    second_doc = next(json_docs, None)
+                    if second_doc is None:
+                        json_data = first_doc
+                    else:
+                        #Newline delimited JSON, handled the same way as a JSON array
+                        json_data = itertools.chain((first_doc, second_doc), json_docs)
+                        json_stream = True
+
+                if json_data is  None:  
+                    LOGGER.warning('process_file - JSON File with no data - [%s]' % file_name)
+                elif json_stream:
+                    array_process_stats, response_code_stats = run_json_array_upload(disco_instance, input_file, json_data, output_writer)
+                    valid_doc_upload_attempt_count = array_process_stats['documents_processed_count']
+                    valid_doc_upload_success_count = array_process_stats['documents_successful_upload_count']
+                elif isinstance(json_data, dict):
+                    valid_doc_upload_attempt_count = 1
+                    document_id = json_data['id'] if 'id' in json_data else None
+
+                    json_data.pop('id', None) #Remove id from document to avoid warning notice.
+                    file_tuple = (file_name, json.dumps(json_data), 'application/json')
+                    doc_ref = get_document_ref(input_file, document_id, JOURNAL_WHOLE_FILE_KEY, get_content_hash(file_tuple[1]))
+                    if is_completed(doc_ref):
+                        return 0, 0, None
+                    upload_res, input_data = upload_document(document_id, file_tuple, doc_ref)
+                    response_code_stats[upload_res['response_code']] += 1
+                    output_writer.write_result(file_name + ' [' + str(upload_res['doc_id']) + ']  | ' + str(upload_res['success']) + ' | ' + upload_res['doc_state'])
+                    if upload_res['success']:
+                        valid_doc_upload_success_count = 1
+                    else:
+                        retry_file_name = input_file
+                else:
+                    LOGGER.warning('process_file  -  Not a know JSON type')
+            else:
+                content_hash = get_file_hash(input_file) if disco_instance.journal is not None or disco_instance.manifest is not None else None
+                doc_ref = get_document_ref(input_file, None, JOURNAL_WHOLE_FILE_KEY, content_hash)
+                if is_completed(doc_ref):
+                    return 0, 0, None
+                valid_doc_upload_attempt_count = 1
+                file_tuple = (file_name, current_file, detect_mime_type(input_file))
+                upload_res, input_data = upload_document(None, file_tuple, doc_ref)
+                response_code_stats[upload_res['response_code']] += 1
+                output_writer.write_result(file_name + ' [' + str(upload_res['doc_id']) + ']  | ' + str(upload_res['success']) + ' | ' + upload_res['doc_state'])
+                if upload_res['success']:
+                    valid_doc_upload_success_count = 1
+                else:
+                    retry_file_name = input_file
+    finally:
+        output_writer.close()
+
+    if output_writer.failed_count:
+        retry_file_name = failed_file_name
+        LOGGER.warning('process_file - Failed json documents written to file %s with %d documents.' % (retry_file_name, output_writer.failed_count))
+        LOGGER.warning('process_file - Response code counts: [%s]' % json.dumps(response_code_stats))
+
+    file_process_elapsed_time = time.time() - file_process_start_time                  
+    LOGGER.info('process_file  -  Single file [%s] processing completed in [%f] seconds' % (input_file, file_process_elapsed_time))
+    return valid_doc_upload_attempt_count, valid_doc_upload_success_count, retry_file_name
+
+def process_fs_input(disco_instance, input_path, output_directory, file_workers=FILE_PIPELINE_THREADS):
+    '''
+    Attempts to process the input provided and upload it to the given discovery instance. The input can either be
+    a file or a directory with files in it. Writes the names of files that need to be retried to a log file.
+    Directories are processed as a pipeline: file_workers threads open and parse files concurrently while all of
+    their uploads share the upload pool of each Discovery target, which stays busy across file boundaries. Binary and
+    single document JSON files wait for their upload in their file thread, so there are at least as many file threads
+    as upload workers across all targets.
+    '''
+    LOGGER.info('process_fs_input  -  Input file location processing started - [%s]' % input_path)
+    file_workers = max(file_workers, disco_instance.max_workers)
+    failed_file_names = []
+    process_dir_stats = defaultdict(int)
+    if os.path.isdir(input_path):
+        LOGGER.debug("process_fs_input  -  Input file location is a directory. Number of files to process: [%d]" % len(os.listdir(input_path)))
+        def record_file_result(file_task):
+            upload_attempted_counter, upload_completed_counter, failed_fname = file_task.result()
+            process_dir_stats['documents_processed_count'] += upload_attempted_counter
+            process_dir_stats['documents_successful_upload_cout'] += upload_completed_counter
+            if failed_fname:
+                failed_file_names.append(failed_fname)
+
+        with ThreadPoolExecutor(max_workers=file_workers, thread_name_prefix='file') as file_executor:
+            pending_file_tasks = set()
+            for subdir, dirs, files in os.walk(input_path):
+                for single_file in files:
+                    process_dir_stats['files_processed_count'] += 1
+                    pending_file_tasks.add(file_executor.submit(process_file, disco_instance, os.path.join(subdir, single_file), output_directory, input_path))
+                    if len(pending_file_tasks) >= 2 * file_workers:
+                        completed_file_tasks, pending_file_tasks = wait(pending_file_tasks, return_when=FIRST_COMPLETED)
+                        for file_task in completed_file_tasks:
+                            record_file_result(file_task)
+
+            for file_task in as_completed(pending_file_tasks):
+                record_file_result(file_task)
+
+
+    elif os.path.isfile(input_path):
+        LOGGER.debug('process_fs_input  -  Input file location is a file.')
+        process_dir_stats['files_processed_count'] = 1
+        upload_attempted_counter, upload_completed_counter, failed_fname = process_file(disco_instance, input_path, output_directory)
+        process_dir_stats['documents_processed_count'] = upload_attempted_counter
+        process_dir_stats['documents_successful_upload_cout'] += upload_completed_counter
+        if failed_fname:
+            failed_file_names.append(failed_fname)
+    else:
+        LOGGER.warning('process_fs_input  -  Provided input file location is not a file nor a directory [ignoring]')
+
+    if failed_file_names:
+        out_file_name = os.path.join(output_directory,RETRY_FILE_NAMES)
+        LOGGER.info('process_fs_input  -  Failed document names written to log file [%s]' % out_file_name)
+        with open(out_file_name,'w', encoding='utf8') as o:
+            o.write('\n'.join(failed_file_names))
+
+    process_dir_stats['rate_controller'] = disco_instance.get_rate_stats()
+    LOGGER.info('process_fs_input  -  Finished processing file system location, statistics [%s]' % json.dumps(process_dir_stats, sort_keys=True, indent=4))
+
+def get_document_status(disco_instance, discovery_doc_id):
+    '''
+    Retrieves the processing status of an uploaded document, paced by the rate controller. Returns the status and the
+    list of notices of the document, or None and an empty list if the status could not be retrieved.
+    '''
+    discovery_url = disco_instance.url + '/v1/environments/{0}/collections/{1}/documents/{2}?version={3}'.format(disco_instance.env_id, disco_instance.col_id, discovery_doc_id, WDS_API_VERSION)
+    session = disco_instance.get_session()
+    rate_controller = disco_instance.rate_controller
+    try:
+        attempt = 0
+        while True:
+            rate_controller.acquire()
+            response = session.get(discovery_url)
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= MAX_UPLOAD_RETRIES:
+                break
+            retry_after = parse_retry_after(response)
+            rate_controller.on_throttled(retry_after)
+            rate_controller.on_retry()
+            time.sleep(get_retry_sleep_time(attempt, retry_after))
+            attempt += 1
+        LOGGER.debug('get_document_status  -  Status response code for document [%s]: [%d]' % (discovery_doc_id, response.status_code))
+        if 200 <= response.status_code <= 299:
+            rate_controller.on_success()
+            response_json = response.json()
+            return response_json.get('status'), response_json.get('notices', [])
+        if response.status_code == 404:
+            return DOC_FAILED_STATE, [{'severity': 'error', 'description': 'Document not found in the collection'}]
+        return None, []
+    except Exception as e:
+        LOGGER.error('get_document_status  -  Status check failure for document [%s]: %s' % (discovery_doc_id, str(e)))
+        return None, []
+
+def load_unverified_documents(journal_file_path):
+    '''
+    Reads the upload journal and returns the documents that were uploaded successfully but whose last known state is
+    not final, keyed by (source file, document key). Only the last entry of each document is considered.
+    '''
+    unverified_docs = {}
+    with open(journal_file_path, 'r', encoding='utf8') as journal_file:
+        for line in journal_file:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            doc_key = (entry['source'], entry['key'])
+            if entry.get('success') and entry.get('doc_id') and entry.get('doc_state') not in DOC_FINAL_STATES:
+                unverified_docs[doc_key] = DocumentRef(entry['key'], entry['hash'], entry.get('manifest_key') or entry['source']), entry['doc_id']
+            else:
+                unverified_docs.pop(doc_key, None)
+    return unverified_docs
+
+def get_output_file_name(output_directory, input_file, input_root, extension):
+    '''
+    Output file (ingestion log or failed documents) of an input file, named after its path relative to the input
+    directory input_root (or its base name when a single file is ingested). Subdirectories are kept in the output
+    directory, so that files with the same name in different subdirectories never share an output file.
+    '''
+    relative_path = os.path.relpath(input_file, input_root) if input_root is not None else ntpath.basename(input_file)
+    out_file_name = os.path.join(output_directory, os.path.splitext(relative_path)[0] + extension)
+    os.makedirs(os.path.dirname(out_file_name), exist_ok=True)
+    return out_file_name
+
+def write_failed_source_documents(source_file, failed_doc_keys, output_directory, input_root=None):
+    '''
+    Copies the documents of a source file that ended in the failed state into the failed documents file of that source
+    (the same NDJSON retry output used for failed uploads). Whole files are retried as they are. Returns the name of the
+    file to retry.
+    '''
+    if JOURNAL_WHOLE_FILE_KEY in failed_doc_keys:
+        return source_file
+    failed_file_name = get_output_file_name(output_directory, source_file, input_root, FAILED_FILE_EXTENSION)
+    with open(source_file, 'r', encoding='utf8') as json_file, open(failed_file_name, 'a', encoding='utf8') as failed_file:
+        #Documents are matched by the key they were journaled with: their id, or their position in the file
+        for doc_number, doc in enumerate(iter_json_documents(json_file), 1):
+            doc_key = doc['id'] if isinstance(doc, dict) and 'id' in doc else str(doc_number)
+            if doc_key in failed_doc_keys:
+                failed_file.write(json.dumps(doc) + '\n')
+    return failed_file_name
+
+def verify_document_status(disco_instance, output_directory, poll_timeout=STATUS_POLL_TIMEOUT, input_root=None):
+    '''
+    Post-ingestion verification stage. Polls the status of every document uploaded in this run (and resumed runs) that is
+    not yet in a final state, with at most disco_instance.max_in_flight status requests in flight on the worker pools of
+    the targets, paced by their rate controllers. Only documents still processing are polled again, with an interval
+    that grows by STATUS_POLL_BACKOFF_FACTOR between rounds, until all are final or poll_timeout seconds have passed.
+    Final states and failure notices are appended to the ingestion logs and journaled. Failed documents are written to
+    the failed documents files and listed in the retry log.
+    '''
+    unverified_docs = load_unverified_documents(disco_instance.journal.journal_file_path)
+    LOGGER.info('verify_document_status  -  Number of documents to verify: [%d]' % len(unverified_docs))
+    verify_stats = defaultdict(int)
+    failed_doc_keys = defaultdict(set)
+    poll_interval = STATUS_POLL_INTERVAL
+    poll_deadline = time.time() + poll_timeout
+    status_logs = {}
+    in_flight_tasks = {}
+
+    def record_document_status(doc_key, doc_ref, discovery_doc_id, status, notices):
+        source_file = doc_key[0]
+        upload_res = {'success': status != DOC_FAILED_STATE, 'response_code': '200', 'doc_id': discovery_doc_id, 'doc_state': status}
+        disco_instance.journal.record(source_file, doc_ref, upload_res)
+        if source_file not in status_logs:
+            status_logs[source_file] = open(get_output_file_name(output_directory, source_file, input_root, INGEST_FILE_EXTENSION), 'a', encoding='utf8')
+        notice_descriptions = '; '.join(notice.get('description', '') for notice in notices)
+        status_logs[source_file].write(discovery_doc_id + ' | ' + str(upload_res['success']) + ' | ' + status + (' | ' + notice_descriptions if notice_descriptions else '') + '\n')
+        verify_stats['documents_%s_count' % status.replace(' ', '_')] += 1
+        if status == DOC_FAILED_STATE:
+            LOGGER.warning('verify_document_status  -  Document [%s] from [%s] failed processing: %s' % (discovery_doc_id, source_file, notice_descriptions))
+            failed_doc_keys[source_file].add(doc_ref.key)
+            if disco_instance.manifest is not None:
+                disco_instance.manifest.remove(doc_ref.manifest_key)
+
+    def record_poll_result(poll_task):
+        doc_key = in_flight_tasks.pop(poll_task)
+        status, notices = poll_task.result()
+        if status in DOC_FINAL_STATES:
+            doc_ref, discovery_doc_id = unverified_docs.pop(doc_key)
+            record_document_status(doc_key, doc_ref, discovery_doc_id, status, notices)
+
+    try:
+        while unverified_docs and time.time() < poll_deadline:
+            time.sleep(min(poll_interval, max(0.0, poll_deadline - time.time())))
+            verify_stats['poll_rounds'] += 1
+            for doc_key, (doc_ref, discovery_doc_id) in list(unverified_docs.items()):
+                target_instance = disco_instance.get_target(doc_ref.manifest_key)
+                in_flight_tasks[target_instance.get_executor().submit(get_document_status, target_instance, discovery_doc_id)] = doc_key
+                if len(in_flight_tasks) >= disco_instance.max_in_flight:
+                    completed_tasks, _ = wait(in_flight_tasks, return_when=FIRST_COMPLETED)
+                    for poll_task in completed_tasks:
+                        record_poll_result(poll_task)
+            for poll_task in as_completed(list(in_flight_tasks)):
+                record_poll_result(poll_task)
+
+            LOGGER.info('verify_document_status  -  Poll round [%d] completed, documents still processing: [%d]' % (verify_stats['poll_rounds'], len(unverified_docs)))
+            poll_interval = min(poll_interval * STATUS_POLL_BACKOFF_FACTOR, STATUS_POLL_MAX_INTERVAL)
+    finally:
+        for status_log in status_logs.values():
+            status_log.close()
+
+    if unverified_docs:
+        LOGGER.warning('verify_document_status  -  [%d] documents were still processing after [%d] seconds, they will be verified again on resume' % (len(unverified_docs), poll_timeout))
+    verify_stats['documents_unverified_count'] = len(unverified_docs)
+
+    if failed_doc_keys:
+        retry_file_path = os.path.join(output_directory, RETRY_FILE_NAMES)
+        retry_file_names = []
+        if os.path.isfile(retry_file_path):
+            with open(retry_file_path, 'r', encoding='utf8') as retry_file:
+                retry_file_names = retry_file.read().splitlines()
+        for source_file, doc_keys in failed_doc_keys.items():
+            retry_file_name = write_failed_source_documents(source_file, doc_keys, output_directory, input_root)
+            if retry_file_name not in retry_file_names:
+                retry_file_names.append(retry_file_name)
+        LOGGER.info('verify_document_status  -  Failed document names written to log file [%s]' % retry_file_path)
+        with open(retry_file_path, 'w', encoding='utf8') as retry_file:
+            retry_file.write('\n'.join(retry_file_names))
+
+    LOGGER.info('verify_document_status  -  Finished verifying document status, statistics [%s]' % json.dumps(verify_stats, sort_keys=True, indent=4))
+    return verify_stats
+
+def parse_target_spec(target_spec):
+    '''
+    Parses an upload target given as creds_key:environment_id:collection_id.
+    '''
+    target_parts = target_spec.split(':')
+    if len(target_parts) != 3 or not all(target_parts):
+        raise ValueError('Invalid target [%s], expected creds_key:environment_id:collection_id' % target_spec)
+    return tuple(target_parts)
+
+def upload_driver(parameters):
+    LOGGER.info("main  -  Input file/directory: [%s]" % (parameters.input_seed))
+
+    input_location = parameters.input_seed
+    output_location = parameters.output_dir
+
+    if parameters.resume_dir:
+        #Resumed runs continue writing into the output directory (and journal) of the interrupted run
+        final_output_dir = parameters.resume_dir
+    else:
+        out_sub_dir = 'DiscoveryUpload_Output_' + time.strftime("%Y%m%d_%H%M%S")
+        final_output_dir = os.path.join(output_location, out_sub_dir)
+    try:
+        if not os.path.exists(final_output_dir):
+            os.makedirs(final_output_dir)
+    except OSError:
+        LOGGER.error("main  -  Error creating output directory: [%s] " %  final_output_dir)
+        raise
+
+    if parameters.targets:
+        target_specs = [parse_target_spec(target_spec) for target_spec in parameters.targets]
+    else:
+        target_specs = [(parameters.user_creds_key, parameters.environment_id, parameters.collection_id)]
+    target_instances = []
+    for creds_key, environment_id, collection_id in target_specs:
+        wds_url, wds_uname, wds_pwd = parse_creds_file(parameters.user_creds_file, creds_key)
+        target_instances.append(DiscoveryInstance(url=wds_url, uname=wds_uname, pwd=wds_pwd, env_id=environment_id,
+                                col_id=collection_id, max_workers=parameters.max_workers, max_in_flight=parameters.max_in_flight,
+                                rate_controller=AdaptiveRateController(initial_rate=parameters.initial_rate, max_rate=parameters.max_rate),
+                                upload_engine=parameters.upload_engine))
+    if len(target_instances) == 1:
+        wds_instance = target_instances[0]
+    else:
+        LOGGER.info("main  -  Sharding documents across [%d] Discovery targets" % len(target_instances))
+        wds_instance = ShardedDiscoveryInstance(target_instances, upload_engine=parameters.upload_engine)
+
+    #VALIDATE DISCOVERY INFO
+    #TODO - valid environment & collection (exists, has space, etc...)
+
+    if input_location.endswith("/"):
+        input_location = input_location[0:len(input_location) - 1]
+    
+    wds_instance.journal = IngestionJournal(os.path.join(final_output_dir, JOURNAL_FILE_NAME), resume=bool(parameters.resume_dir))
+    if parameters.manifest_file:
+        wds_instance.manifest = DocumentManifest(parameters.manifest_file)
+    wds_instance.metrics = UploadMetrics(os.path.join(final_output_dir, METRICS_FILE_NAME), rate_controllers=[target.rate_controller for target in wds_instance.get_targets()])
+    for target_instance in wds_instance.get_targets():
+        target_instance.metrics = wds_instance.metrics
+    wds_instance.metrics.start()
+    try:
+        process_fs_input(wds_instance, input_location, final_output_dir, parameters.file_workers)
+        if wds_instance.manifest is not None and parameters.delete_missing:
+            delete_missing_documents(wds_instance, wds_instance.manifest)
+        if parameters.verify_status:
+            verify_document_status(wds_instance, final_output_dir, parameters.verify_timeout, input_location if os.path.isdir(input_location) else None)
+    finally:
+        wds_instance.close()
+        wds_instance.journal.close()
+        wds_instance.metrics.close()
+        if wds_instance.manifest is not None:
+            wds_instance.manifest.close()
+    return final_output_dir
+
+class IngestionJournal:
+    '''
+    Append-only checkpoint journal of document uploads, written as each upload completes. Every line is a JSON object
+    with the source file, the document key (id, array index, or empty for whole files), the content hash, and the upload
+    result. When resuming, entries of the existing journal that were uploaded successfully are loaded (as compact digests)
+    so that unchanged documents are skipped.
+    '''
+    def __init__(self, journal_file_path, resume=False):
+        self.journal_file_path = journal_file_path
+        self.completed_digests = set()
+        if resume and os.path.isfile(journal_file_path):
+            self.load()
+        self.journal_file = open(journal_file_path, 'a', encoding='utf8')
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def get_digest(source_file, doc_key, content_hash):
+        return hashlib.sha1(('%s\0%s\0%s' % (os.path.abspath(source_file), doc_key, content_hash)).encode('utf8')).digest()
+
+    def load(self):
+        with open(self.journal_file_path, 'r', encoding='utf8') as journal_file:
+            for line in journal_file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    #Last line may be partially written if the previous run was killed
+                    continue
+                #Later entries of a document (e.g. a failed final status found by verification) replace earlier ones
+                digest = self.get_digest(entry['source'], entry['key'], entry['hash'])
+                if entry.get('success'):
+                    self.completed_digests.add(digest)
+                else:
+                    self.completed_digests.discard(digest)
+        LOGGER.info('IngestionJournal  -  Loaded [%d] completed uploads from journal [%s]' % (len(self.completed_digests), self.journal_file_path))
+
+    def is_completed(self, source_file, doc_key, content_hash):
+        return self.get_digest(source_file, doc_key, content_hash) in self.completed_digests
+
+    def record(self, source_file, doc_ref, upload_res):
+        entry = {'source': os.path.abspath(source_file), 'key': doc_ref.key, 'hash': doc_ref.content_hash, 'manifest_key': doc_ref.manifest_key, 'success': upload_res['success'],
+                 'response_code': upload_res['response_code'], 'doc_id': upload_res['doc_id'], 'doc_state': upload_res['doc_state']}
+        line = json.dumps(entry) + '\n'
+        with self.lock:
+            self.journal_file.write(line)
+            self.journal_file.flush()
+
+    def close(self):
+        with self.lock:
+            if not self.journal_file.closed:
+                self.journal_file.flush()
+                os.fsync(self.journal_file.fileno())
+                self.journal_file.close()
+
+class MultipartFileStream:
+    '''
+    File-like multipart/form-data body with a single file part. The part headers, the file content (read from the open
+    binary file in UPLOAD_CHUNK_SIZE chunks) and the closing boundary are produced on demand, and the total length is known
+    up front, so the HTTP client streams the upload with a Content-Length instead of building the whole body in memory.
+    '''
+    def __init__(self, field_name, file_name, file_obj, content_type, chunk_size=UPLOAD_CHUNK_SIZE):
+        boundary = uuid.uuid4().hex
+        part_header = ('--%s\r\nContent-Disposition: form-data; name="%s"; filename="%s"\r\nContent-Type: %s\r\n\r\n' % (boundary, field_name, file_name.replace('"', '%22'), content_type)).encode('utf8')
+        part_footer = ('\r\n--%s--\r\n' % boundary).encode('utf8')
+        file_obj.seek(0, os.SEEK_END)
+        file_size = file_obj.tell()
+        file_obj.seek(0)
+        self.content_type = 'multipart/form-data; boundary=' + boundary
+        self.chunk_size = chunk_size
+        self.length = len(part_header) + file_size + len(part_footer)
+        self.parts = [io.BytesIO(part_header), file_obj, io.BytesIO(part_footer)]
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        chunk = self.read(self.chunk_size)
+        while chunk:
+            yield chunk
+            chunk = self.read(self.chunk_size)
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.length
+        chunks = []
+        while self.parts and size > 0:
+            chunk = self.parts[0].read(size)
+            if not chunk:
+                self.parts.pop(0)
+                continue
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b''.join(chunks)
+
+class IngestionOutputWriter:
+    '''
+    Dedicated writer thread for the ingestion results log and the failed documents (NDJSON) of an input file. Lines are
+    queued by the upload threads as results complete and written incrementally, with a flush every flush_interval
+    seconds, so memory does not depend on the number of documents and both files can be read while a run is going.
+    The failed documents file is only created when the first failure is written.
+    '''
+    def __init__(self, log_file_name, failed_file_name, flush_interval=OUTPUT_FLUSH_INTERVAL):
+        self.log_file_name = log_file_name
+        self.failed_file_name = failed_file_name
+        self.flush_interval = flush_interval
+        self.failed_count = 0
+        self.output_queue = queue.Queue(maxsize=OUTPUT_QUEUE_SIZE)
+        self.writer_thread = threading.Thread(target=self.run, name='writer_' + ntpath.basename(log_file_name), daemon=True)
+        self.writer_thread.start()
+
+    def write_result(self, result_line):
+        self.output_queue.put((self.log_file_name, result_line))
+
+    def write_failed(self, doc_content, doc_id=None):
+        self.failed_count += 1
+        self.output_queue.put((self.failed_file_name, (doc_content, doc_id)))
+
+    def run(self):
+        output_files = {}
+        last_flush_time = time.monotonic()
+        try:
+            output_files[self.log_file_name] = open(self.log_file_name, 'a', encoding='utf8')
+            while True:
+                try:
+                    output_item = self.output_queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    output_item = None
+                if output_item is not None:
+                    output_file_name, output_line = output_item
+                    if output_file_name is None:
+                        break
+                    if output_file_name == self.failed_file_name:
+                        doc_content, doc_id = output_line
+                        output_line = doc_content
+                        if doc_id is not None:
+                            f_doc = json.loads(doc_content)
+                            f_doc['id'] = doc_id
+                            output_line = json.dumps(f_doc)
+                    if output_file_name not in output_files:
+                        output_files[output_file_name] = open(output_file_name, 'a', encoding='utf8')
+                    output_files[output_file_name].write(output_line + '\n')
+                if time.monotonic() - last_flush_time >= self.flush_interval:
+                    for output_file in output_files.values():
+                        output_file.flush()
+                    last_flush_time = time.monotonic()
+        except Exception as e:
+            LOGGER.error('IngestionOutputWriter  -  Error writing ingestion output [%s]: %s' % (self.log_file_name, str(e)))
+            #Keep draining the queue so that upload threads never block on a failed writer
+            while self.output_queue.get()[0] is not None:
+                pass
+        finally:
+            for output_file in output_files.values():
+                output_file.close()
+
+    def close(self):
+        self.output_queue.put((None, None))
+        self.writer_thread.join()
+
+class DocumentManifest:
+    '''
+    Persistent SQLite index of uploaded documents (document id or file path -> content hash and Discovery document_id),
+    used to upload only new or changed documents on later runs. The database is opened lazily on first use, lookups go
+    through the primary key index, and writes are committed in batches of MANIFEST_COMMIT_INTERVAL. Every document seen
+    in a run is stamped with the run id so that documents missing from the source can be found afterwards.
+    '''
+    def __init__(self, manifest_path, run_id=None):
+        self.manifest_path = manifest_path
+        self.run_id = run_id if run_id is not None else time.strftime("%Y%m%d_%H%M%S")
+        self.connection = None
+        self.pending_writes = 0
+        self.lock = threading.Lock()
+
+    def get_connection(self):
+        if self.connection is None:
+            import sqlite3
+            self.connection = sqlite3.connect(self.manifest_path, check_same_thread=False)
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('PRAGMA synchronous=NORMAL')
+            self.connection.execute('CREATE TABLE IF NOT EXISTS documents (key TEXT PRIMARY KEY, content_hash TEXT, discovery_id TEXT, last_seen TEXT) WITHOUT ROWID')
+            LOGGER.info('DocumentManifest  -  Manifest opened [%s]' % self.manifest_path)
+        return self.connection
+
+    def _write(self, statement, values):
+        self.get_connection().execute(statement, values)
+        self.pending_writes += 1
+        if self.pending_writes >= MANIFEST_COMMIT_INTERVAL:
+            self.connection.commit()
+            self.pending_writes = 0
+
+    def is_unchanged(self, key, content_hash):
+        with self.lock:
+            row = self.get_connection().execute('SELECT content_hash FROM documents WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return False
+            self._write('UPDATE documents SET last_seen = ? WHERE key = ?', (self.run_id, key))
+            return row[0] == content_hash
+
+    def get_discovery_id(self, key):
+        with self.lock:
+            row = self.get_connection().execute('SELECT discovery_id FROM documents WHERE key = ?', (key,)).fetchone()
+            return row[0] if row is not None else None
+
+    def update(self, key, content_hash, discovery_id):
+        with self.lock:
+            self._write('INSERT OR REPLACE INTO documents (key, content_hash, discovery_id, last_seen) VALUES (?, ?, ?, ?)', (key, content_hash, discovery_id, self.run_id))
+
+    def remove(self, key):
+        with self.lock:
+            self._write('DELETE FROM documents WHERE key = ?', (key,))
+
+    def get_missing(self):
+        with self.lock:
+            return self.get_connection().execute('SELECT key, discovery_id FROM documents WHERE last_seen != ?', (self.run_id,)).fetchall()
+
+    def commit(self):
+        with self.lock:
+            if self.connection is not None:
+                self.connection.commit()
+                self.pending_writes = 0
+
+    def close(self):
+        self.commit()
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+class UploadMetrics:
+    '''
+    Thread-safe upload instrumentation. Records the latency of every HTTP request in a fixed log-scale histogram (bounded
+    memory, used for p50/p95/p99), documents and bytes per second over a sliding window of per-second buckets, the number
+    of documents submitted but not completed (queue depth), and throttled (429/503) and retry rates. A reporter thread
+    appends a JSON snapshot to the metrics file every snapshot_interval seconds, and a final one on close.
+    '''
+    def __init__(self, metrics_file_name, rate_controllers=(), snapshot_interval=METRICS_SNAPSHOT_INTERVAL, window_seconds=METRICS_WINDOW_SECONDS):
+        self.metrics_file_name = metrics_file_name
+        self.rate_controllers = rate_controllers
+        self.snapshot_interval = snapshot_interval
+        self.window_seconds = window_seconds
+        self.start_time = time.monotonic()
+        self.total_latencies = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.interval_latencies = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.window = deque()
+        self.counters = defaultdict(int)
+        self.response_codes = defaultdict(int)
+        self.queue_depth = 0
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.reporter_thread = None
+
+    def get_window_bucket(self):
+        current_second = int(time.monotonic())
+        if not self.window or self.window[-1][0] != current_second:
+            self.window.append([current_second, 0, 0, 0, 0, 0])
+            while self.window[0][0] <= current_second - self.window_seconds:
+                self.window.popleft()
+        return self.window[-1]
+
+    def record_request(self, latency, status_code, request_bytes, attempt=0):
+        bucket_index = bisect.bisect_left(LATENCY_BUCKETS, latency)
+        with self.lock:
+            self.total_latencies[bucket_index] += 1
+            self.interval_latencies[bucket_index] += 1
+            self.response_codes[str(status_code)] += 1
+            self.counters['requests'] += 1
+            self.counters['bytes_sent'] += request_bytes
+            window_bucket = self.get_window_bucket()
+            window_bucket[2] += request_bytes
+            window_bucket[3] += 1
+            if status_code in RETRY_STATUS_CODES:
+                self.counters['throttled_responses'] += 1
+                window_bucket[4] += 1
+            if attempt > 0:
+                self.counters['retries'] += 1
+                window_bucket[5] += 1
+
+    def document_submitted(self):
+        with self.lock:
+            self.queue_depth += 1
+
+    def document_completed(self, success):
+        with self.lock:
+            self.queue_depth = max(0, self.queue_depth - 1)
+            self.counters['documents_completed'] += 1
+            if not success:
+                self.counters['documents_failed'] += 1
+            self.get_window_bucket()[1] += 1
+
+    @staticmethod
+    def get_percentile(histogram, percentile):
+        total_count = sum(histogram)
+        if total_count == 0:
+            return None
+        threshold = total_count * percentile
+        cumulative_count = 0
+        for bucket_index, bucket_count in enumerate(histogram):
+            cumulative_count += bucket_count
+            if cumulative_count >= threshold:
+                return round(LATENCY_BUCKETS[min(bucket_index, len(LATENCY_BUCKETS) - 1)], 4)
+
+    def get_snapshot(self):
+        with self.lock:
+            now = time.monotonic()
+            self.get_window_bucket()
+            window_span = max(1.0, min(self.window_seconds, now - self.start_time))
+            window_docs = sum(bucket[1] for bucket in self.window)
+            window_bytes = sum(bucket[2] for bucket in self.window)
+            window_requests = sum(bucket[3] for bucket in self.window)
+            window_throttled = sum(bucket[4] for bucket in self.window)
+            window_retries = sum(bucket[5] for bucket in self.window)
+            snapshot = {
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'elapsed_seconds': round(now - self.start_time, 3),
+                'documents_per_second': round(window_docs / window_span, 3),
+                'bytes_per_second': round(window_bytes / window_span, 3),
+                'requests_per_second': round(window_requests / window_span, 3),
+                'throttled_rate': round(window_throttled / window_requests, 4) if window_requests else 0.0,
+                'retry_rate': round(window_retries / window_requests, 4) if window_requests else 0.0,
+                'queue_depth': self.queue_depth,
+                'latency_seconds': {
+                    'p50': self.get_percentile(self.interval_latencies, 0.50),
+                    'p95': self.get_percentile(self.interval_latencies, 0.95),
+                    'p99': self.get_percentile(self.interval_latencies, 0.99),
+                },
+                'total_latency_seconds': {
+                    'p50': self.get_percentile(self.total_latencies, 0.50),
+                    'p95': self.get_percentile(self.total_latencies, 0.95),
+                    'p99': self.get_percentile(self.total_latencies, 0.99),
+                },
+                'response_codes': dict(self.response_codes),
+            }
+            snapshot.update(self.counters)
+            self.interval_latencies = [0] * (len(LATENCY_BUCKETS) + 1)
+        if self.rate_controllers:
+            snapshot['current_rate'] = round(sum(rate_controller.get_stats()['current_rate'] for rate_controller in self.rate_controllers), 3)
+        return snapshot
+
+    def write_snapshot(self):
+        snapshot = self.get_snapshot()
+        with open(self.metrics_file_name, 'a', encoding='utf8') as metrics_file:
+            metrics_file.write(json.dumps(snapshot) + '\n')
+        LOGGER.info('UploadMetrics  -  [%d] documents completed, [%.1f] docs/sec, queue depth [%d], p95 latency [%s]' % (snapshot.get('documents_completed', 0), snapshot['documents_per_second'], snapshot['queue_depth'], snapshot['latency_seconds']['p95']))
+        return snapshot
+
+    def run(self):
+        while not self.stop_event.wait(self.snapshot_interval):
+            try:
+                self.write_snapshot()
+            except Exception as e:
+                LOGGER.error('UploadMetrics  -  Error writing metrics snapshot: %s' % str(e))
+
+    def start(self):
+        self.reporter_thread = threading.Thread(target=self.run, name='metrics_reporter', daemon=True)
+        self.reporter_thread.start()
+
+    def close(self):
+        self.stop_event.set()
+        if self.reporter_thread is not None:
+            self.reporter_thread.join()
+        return self.write_snapshot()
+
+class AdaptiveRateController:
+    '''
+    Token bucket shared by all upload workers of a Discovery instance. The refill rate starts in slow start (every
+    successful request adds 1 request/sec, doubling the rate each second) until the first throttled response, then follows
+    additive-increase / multiplicative-decrease: every successful request raises the rate by about increase_step
+    requests/sec per second, every throttled response (at most once per RATE_DECREASE_INTERVAL) multiplies it by
+    decrease_factor. The rate only grows while the bucket is actually limiting requests, so it does not drift above the
+    rate the workers can use. A Retry-After from the service pauses all workers until it expires.
+    '''
+    def __init__(self, initial_rate=INITIAL_REQUEST_RATE, min_rate=MIN_REQUEST_RATE, max_rate=MAX_REQUEST_RATE,
+                 increase_step=RATE_INCREASE_STEP, decrease_factor=RATE_DECREASE_FACTOR):
+        self.min_rate = min_rate
+        self.max_rate = max(max_rate, min_rate)
+        self.rate = min(max(initial_rate, self.min_rate), self.max_rate)
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.tokens = 1.0
+        self.last_refill_time = time.monotonic()
+        self.last_decrease_time = 0.0
+        self.last_limited_time = 0.0
+        self.slow_start = True
+        self.paused_until = 0.0
+        self.stats = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def try_acquire(self):
+        '''
+        Takes a token if one is available and returns 0, otherwise returns the number of seconds to wait before trying again.
+        '''
+        with self.lock:
+            now = time.monotonic()
+            if now < self.paused_until:
+                return self.paused_until - now
+            capacity = max(1.0, self.rate / 10)
+            self.tokens = min(capacity, self.tokens + (now - self.last_refill_time) * self.rate)
+            self.last_refill_time = now
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                self.stats['requests'] += 1
+                return 0
+            self.last_limited_time = now
+            return (1.0 - self.tokens) / self.rate
+
+    def acquire(self):
+        wait_time = self.try_acquire()
+        while wait_time > 0:
+            time.sleep(wait_time)
+            wait_time = self.try_acquire()
+
+    async def acquire_async(self):
+        import asyncio
+        wait_time = self.try_acquire()
+        while wait_time > 0:
+            await asyncio.sleep(wait_time)
+            wait_time = self.try_acquire()
+
+    def on_success(self):
+        with self.lock:
+            if time.monotonic() - self.last_limited_time > RATE_DECREASE_INTERVAL:
+                return
+            increase = 1.0 if self.slow_start else self.increase_step / self.rate
+            self.rate = min(self.max_rate, self.rate + increase)
+
+    def on_throttled(self, retry_after=None):
+        with self.lock:
+            now = time.monotonic()
+            self.stats['throttled_responses'] += 1
+            if now - self.last_decrease_time >= RATE_DECREASE_INTERVAL:
+                self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+                self.slow_start = False
+                self.tokens = min(self.tokens, 0.0)
+                self.last_decrease_time = now
+                self.stats['rate_decreases'] += 1
+            if retry_after:
+                self.paused_until = max(self.paused_until, now + retry_after)
+
+    def on_retry(self):
+        with self.lock:
+            self.stats['retries'] += 1
+
+    def get_stats(self):
+        with self.lock:
+            current_stats = dict(self.stats)
+            current_stats['current_rate'] = round(self.rate, 3)
+            return current_stats
+
+class DiscoveryInstance:
+    def __init__(self, url, uname, pwd, env_id=None, col_id=None, max_workers=MAX_NUMBER_THREADS, max_in_flight=MAX_IN_FLIGHT_UPLOADS, rate_controller=None, upload_engine=UPLOAD_ENGINE_THREADS):
+        self.url = url
+        self.uname = uname
+        self.pwd = pwd
+        self.env_id = env_id
+        self.col_id = col_id
+        self.max_workers = max_workers
+        self.max_in_flight = max(max_in_flight, max_workers)
+        self.rate_controller = rate_controller if rate_controller is not None else AdaptiveRateController()
+        self.upload_engine = upload_engine
+        self.journal = None
+        self.manifest = None
+        self.metrics = None
+        self.session = None
+        self.executor = None
+        self.session_lock = threading.Lock()
+
+    def get_target(self, routing_key):
+        return self
+
+    def get_targets(self):
+        return [self]
+
+    def get_rate_stats(self):
+        return self.rate_controller.get_stats()
+
+    def get_executor(self):
+        '''
+        Returns the pool of upload workers of this instance, creating it on first use. The pool is shared by every file
+        uploaded to this instance.
+        '''
+        if self.executor is None:
+            with self.session_lock:
+                if self.executor is None:
+                    self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='upload_%s' % self.col_id)
+        return self.executor
+
+    def get_session(self):
+        '''
+        Returns the keep-alive HTTP session shared by all upload workers, creating it on first use. Authentication and
+        headers are set once, and the connection pool is sized to the number of workers so that every worker reuses
+        an open connection (and TLS session) instead of connecting for each document.
+        '''
+        if self.session is None:
+            with self.session_lock:
+                if self.session is None:
+                    session = requests.Session()
+                    session.auth = (self.uname, self.pwd)
+                    session.headers['accept'] = 'application/json'
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers, pool_block=True, max_retries=0)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self.session = session
+        return self.session
+
+    def close(self):
+        with self.session_lock:
+            if self.executor is not None:
+                self.executor.shutdown()
+                self.executor = None
+            if self.session is not None:
+                self.session.close()
+                self.session = None
+
+class ShardedDiscoveryInstance:
+    '''
+    Routes documents across several Discovery instances / collections by a stable hash of their id (or source path), so
+    that throughput scales with the number of collections. Each target keeps its own worker pool, session and rate
+    controller, while the journal, manifest and metrics of the run are shared and results are combined.
+    '''
+    def __init__(self, targets, upload_engine=UPLOAD_ENGINE_THREADS):
+        self.targets = targets
+        self.upload_engine = upload_engine
+        self.max_workers = sum(target.max_workers for target in targets)
+        self.max_in_flight = sum(target.max_in_flight for target in targets)
+        self.journal = None
+        self.manifest = None
+        self.metrics = None
+
+    def get_target(self, routing_key):
+        routing_hash = int(hashlib.md5(routing_key.encode('utf8')).hexdigest()[:8], 16)
+        return self.targets[routing_hash % len(self.targets)]
+
+    def get_targets(self):
+        return self.targets
+
+    def get_rate_stats(self):
+        return {'%s/%s' % (target.env_id, target.col_id): target.get_rate_stats() for target in self.targets}
+
+    def close(self):
+        for target in self.targets:
+            target.close()
+
+def main(argv=None, command='upload'):
+    '''
+    Parses the upload options (argv, or the command line) and runs the upload in this process. Returns the output
+    directory of the run.
+    '''
+    parser = argparse.ArgumentParser(prog="python -m misc_scripts %s" % command, description='Script that uploads documents to a WDS collection')
+    parser.add_argument('-creds-file', dest='user_creds_file', required=True, help='WDS credentials file name')
+    parser.add_argument('-creds-key', dest='user_creds_key', help='WDS credentials key')
+    parser.add_argument('-input-location', dest='input_seed', required=True, help='File or Directory of documents being ingested.')
+    parser.add_argument('-output-location', dest='output_dir', required=True, help='Directory to store output and failed documents')
+    parser.add_argument('-environment', dest='environment_id', help='WDS environment ID')
+    parser.add_argument('-collection', dest='collection_id', help='WDS Collection ID')
+    parser.add_argument('-targets', dest='targets', nargs='+', help='Shard documents across several targets, each given as creds_key:environment_id:collection_id (replaces -creds-key, -environment and -collection)')
+    parser.add_argument('-threads', dest='max_workers', type=int, default=MAX_NUMBER_THREADS, help='Number of upload worker threads')
+    parser.add_argument('-file-threads', dest='file_workers', type=int, default=FILE_PIPELINE_THREADS, help='Number of threads reading files when the input is a directory (at least the total number of upload threads)')
+    parser.add_argument('-max-in-flight', dest='max_in_flight', type=int, default=MAX_IN_FLIGHT_UPLOADS, help='Maximum number of submitted uploads not yet completed')
+    parser.add_argument('-initial-rate', dest='initial_rate', type=float, default=INITIAL_REQUEST_RATE, help='Initial upload requests per second (adapted to throttling)')
+    parser.add_argument('-max-rate', dest='max_rate', type=float, default=MAX_REQUEST_RATE, help='Upper bound for upload requests per second')
+    parser.add_argument('-engine', dest='upload_engine', choices=[UPLOAD_ENGINE_THREADS, UPLOAD_ENGINE_ASYNCIO], default=UPLOAD_ENGINE_THREADS,
+                        help='Upload engine for JSON arrays. asyncio (requires aiohttp) runs up to -max-in-flight concurrent requests')
+    parser.add_argument('-resume', dest='resume_dir', help='Output directory of an interrupted run. Documents its journal marks as successful are skipped')
+    parser.add_argument('-manifest', dest='manifest_file', help='SQLite manifest of uploaded documents. Only new or changed documents are uploaded')
+    parser.add_argument('-delete-missing', dest='delete_missing', action='store_true', help='With -manifest, delete documents that are no longer in the input location')
+    parser.add_argument('-verify', dest='verify_status', action='store_true', help='After uploading, poll the status of the documents still processing until they are final')
+    parser.add_argument('-verify-timeout', dest='verify_timeout', type=float, default=STATUS_POLL_TIMEOUT, help='Maximum number of seconds spent polling document status')
+    parser.add_argument('-debug', dest="log_level", help="Set DEBUG logging level", action="store_const",
+                        const=logging.DEBUG, default=logging.INFO)
+
+    args = parser.parse_args(argv)
+    if not args.targets and not (args.user_creds_key and args.environment_id and args.collection_id):
+        parser.error('either -targets or all of -creds-key, -environment and -collection are required')
+
+    started_time = time.time()
+    initialize_logger(args.log_level)
+    LOGGER.info("Starting discovery file upload script......")
+    output_dir = upload_driver(args)
+    elapsed = time.time() - started_time
+    LOGGER.info("Finished discovery file upload script. Elapsed time: %f" % elapsed)
+    return output_dir
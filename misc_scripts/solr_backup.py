@@ -0,0 +1,1023 @@
+import os
+import re
+import json
+import logging
+import argparse
+import time
+import gzip
+import io
+import csv
+import queue
+import bisect
+import threading
+
+from concurrent.futures import ThreadPoolExecutor, wait, as_completed, FIRST_COMPLETED
+
+from .common import initialize_logger, parse_creds_file, iter_json_documents, JSON_READ_CHUNK_SIZE
+
+ROWS_BATCH_AMOUNT = 200
+MIN_ROWS_BATCH_AMOUNT = 50
+MAX_ROWS_BATCH_AMOUNT = 5000
+#Ids read per page when looking for the boundaries of range partitions
+RANGE_BOUNDARY_PAGE_SIZE = 100000
+TARGET_PAGE_LATENCY = 1.0
+TARGET_PAGE_BYTES = 8 * 1024 * 1024
+PREFETCH_PAGES = 2
+SPLI_DOC_AMOUNT = 5000
+DEBUG_INTERVAL = 1000
+ALL_DOCS_QUERY = "*:*"
+OUTPUT_TSTAMP_FORMAT = "%Y%m%d-%H%M%S"
+PARTITION_MODE_HASH = 'hash'
+PARTITION_MODE_RANGE = 'range'
+PARTITION_MODES = (PARTITION_MODE_HASH, PARTITION_MODE_RANGE)
+MAX_PARTITION_THREADS = 8
+OUTPUT_FORMAT_JSON = 'json'
+OUTPUT_FORMAT_NDJSON = 'ndjson'
+OUTPUT_FORMATS = (OUTPUT_FORMAT_JSON, OUTPUT_FORMAT_NDJSON)
+COMPRESSION_GZIP = 'gzip'
+COMPRESSION_ZSTD = 'zstd'
+COMPRESSION_EXTENSIONS = {None: '', COMPRESSION_GZIP: '.gz', COMPRESSION_ZSTD: '.zst'}
+GZIP_COMPRESS_LEVEL = 6
+ZSTD_COMPRESS_LEVEL = 3
+CHECKPOINT_FILE_EXTENSION = '.checkpoint.json'
+#<collection>_<backup_id>.checkpoint.json, backup ids are OUTPUT_TSTAMP_FORMAT timestamps
+CHECKPOINT_FILE_PATTERN = r'%s_\d{8}-\d{6}' + re.escape(CHECKPOINT_FILE_EXTENSION)
+BACKUP_CHAIN_FILE_NAME = '%s_backups.json'
+BACKUP_TYPE_FULL = 'full'
+BACKUP_TYPE_INCREMENTAL = 'incremental'
+DEFAULT_SINCE_FIELD = '_version_'
+RESPONSE_FORMAT_JSON = 'json'
+RESPONSE_FORMAT_CSV = 'csv'
+RESPONSE_FORMATS = (RESPONSE_FORMAT_JSON, RESPONSE_FORMAT_CSV)
+BACKUP_OPTIONS = ('filter_param', 'split_files', 'output_format', 'compression', 'rotate_docs', 'rotate_mb', 'field_list', 'response_format')
+BACKUP_FILE_EXTENSIONS = tuple('.' + output_format + compression_extension for output_format in OUTPUT_FORMATS for compression_extension in COMPRESSION_EXTENSIONS.values())
+JSON_BLOCK_SEPARATORS = ' \t\r\n,['
+INDEX_FILE_EXTENSION = '.idx'
+INDEX_BLOCK_BYTES = 128 * 1024
+RESTORE_BATCH_SIZE = 500
+RESTORE_THREADS = 4
+RESTORE_COMMIT_WITHIN = 10000
+RESTORE_MAX_RETRIES = 5
+RESTORE_PROGRESS_INTERVAL = 50000
+RESTORE_EXCLUDED_FIELDS = ('_version_',)
+RETRY_SLEEP_TIME = 0.5
+RETRY_MAX_SLEEP_TIME = 30.0
+COMMAND_BACKUP = 'backup'
+COMMAND_RESTORE = 'restore'
+COMMAND_LOOKUP = 'lookup'
+COMMAND_DESCRIPTIONS = {
+    COMMAND_BACKUP: 'Pulls documents from a Solr collection to backup files',
+    COMMAND_RESTORE: 'Restores backup files into a Solr collection',
+    COMMAND_LOOKUP: 'Prints documents by id from the backup files of an output location (no Solr access)',
+}
+
+LOGGER = logging.getLogger(__name__)
+
+def get_pysolr():
+    '''
+    pysolr (and requests) are only imported by the commands that talk to Solr, a lookup in backup files does not need them.
+    '''
+    import pysolr
+    return pysolr
+
+def get_solr_client(credentials_file_path, credentials_key_name, rnr_clusterid, rnr_collection):
+    '''
+    Instantiates a pysolr client to use against the R&R instance specified in the credentials file. 
+    '''
+    rnr_url, rnr_uname, rnr_pwd = parse_creds_file(credentials_file_path, credentials_key_name)
+    base_url = rnr_url.replace('https://',
+                                'https://' + rnr_uname + ':' +
+                                rnr_pwd + '@')
+    url = base_url + '/v1/solr_clusters/{0}/solr/{1}'.format(
+            rnr_clusterid, rnr_collection)
+    solr_client = get_pysolr().Solr(url)
+    
+    LOGGER.debug("get_solr_client - Pysolr client created to url: %s" % url)
+    assert solr_client is not None
+    return solr_client
+
+def add_filter_param(kwargs, filter_param):
+    '''
+    Adds the filter parameter (or list of filter parameters) to the query arguments. Hash partition filters also need
+    the field the hash is computed on.
+    '''
+    if filter_param is None:
+        return
+    kwargs['fq'] = filter_param
+    filter_list = filter_param if isinstance(filter_param, (list, tuple)) else [filter_param]
+    if any(fq.startswith('{!hash ') for fq in filter_list):
+        kwargs['partitionKeys'] = 'id'
+
+def get_field_list(field_list):
+    '''
+    Returns the fl parameter for a comma separated list of fields. The id field is always exported, restores and CSV
+    paging need it.
+    '''
+    if not field_list:
+        return None
+    field_names = [field_name.strip() for field_name in field_list.split(',') if field_name.strip()]
+    if 'id' not in field_names:
+        field_names.insert(0, 'id')
+    return ','.join(field_names)
+
+def parse_csv_documents(response_text):
+    '''
+    Parses a Solr CSV response (header row of field names, then one row per document) into documents. Empty values are
+    fields missing from the document. All values are returned as strings, so CSV is meant for flat schemas of single
+    valued fields, Solr converts the values back to the field types when they are restored.
+    '''
+    rows = csv.reader(io.StringIO(response_text))
+    field_names = next(rows, None)
+    if field_names is None:
+        return []
+    return [{field_name: value for field_name, value in zip(field_names, row) if value != ''} for row in rows if row]
+
+def search_page(solr_client, kwargs, cursor_mark, page_size, response_format=RESPONSE_FORMAT_JSON):
+    '''
+    Requests one page of documents sorted by id and returns it along with the cursor mark of the next page. The Solr
+    CSV writer drops nextCursorMark, so CSV pages are chained on the id instead: their cursor mark is the last id of the
+    previous page (quoted) and the next page is filtered to the ids after it, which keeps deep pages as cheap as cursor
+    pages.
+    '''
+    if response_format == RESPONSE_FORMAT_CSV:
+        params = dict(kwargs, q=ALL_DOCS_QUERY, rows=page_size, wt='csv')
+        if cursor_mark != '*':
+            params['fq'] = get_filter_list(kwargs.get('fq'), 'id:{%s TO *]' % cursor_mark)
+        docs = parse_csv_documents(solr_client._select(params))
+        return docs, quote_query_term(docs[-1]['id']) if docs else cursor_mark
+    res = solr_client.search(ALL_DOCS_QUERY, cursorMark=cursor_mark, rows=page_size, **kwargs)
+    return res.docs, res.nextCursorMark
+
+def get_next_page_size(page_size, page_latency, page_docs, max_page_size=MAX_ROWS_BATCH_AMOUNT):
+    '''
+    Adapts the number of rows requested per page so that a page takes about TARGET_PAGE_LATENCY seconds and stays under
+    TARGET_PAGE_BYTES (estimated from the size of a sample document). The size changes at most 2x per page and stays
+    between MIN_ROWS_BATCH_AMOUNT and max_page_size.
+    '''
+    next_page_size = page_size * TARGET_PAGE_LATENCY / max(page_latency, 0.001)
+    if page_docs:
+        doc_bytes = len(json.dumps(page_docs[len(page_docs) // 2]))
+        next_page_size = min(next_page_size, TARGET_PAGE_BYTES / max(doc_bytes, 1))
+    next_page_size = max(page_size / 2.0, min(page_size * 2.0, next_page_size))
+    return int(max(MIN_ROWS_BATCH_AMOUNT, min(max_page_size, next_page_size)))
+
+def fetch_document_pages(solr_client, kwargs, cursor_mark, page_size, max_page_size, response_format, page_queue, stop_event):
+    '''
+    Producer of the page pipeline, runs in its own thread. Requests the next cursor page as soon as the previous one is
+    queued, so network round trips overlap with the parsing and writing of earlier pages.
+    '''
+    def put_page(page):
+        #The consumer may stop early (stop_event), so never block on a full queue forever
+        while not stop_event.is_set():
+            try:
+                page_queue.put(page, timeout=1.0)
+                return
+            except queue.Full:
+                continue
+
+    try:
+        while not stop_event.is_set():
+            request_start_time = time.time()
+            docs, next_cursor_mark = search_page(solr_client, kwargs, cursor_mark, page_size, response_format)
+            page_latency = time.time() - request_start_time
+            if not docs:
+                break
+            put_page((docs, next_cursor_mark))
+            if next_cursor_mark == cursor_mark:
+                break
+            cursor_mark = next_cursor_mark
+            next_page_size = get_next_page_size(page_size, page_latency, docs, max_page_size)
+            if next_page_size != page_size:
+                LOGGER.debug('fetch_document_pages - Page size changed from %d to %d rows (page latency %.3f seconds)' % (page_size, next_page_size, page_latency))
+                page_size = next_page_size
+        put_page(None)
+    except Exception as e:
+        put_page(e)
+
+def get_document_pages(solr_client, filter_param, cursor_mark="*", page_size=ROWS_BATCH_AMOUNT, max_page_size=MAX_ROWS_BATCH_AMOUNT,
+                       field_list=None, response_format=RESPONSE_FORMAT_JSON):
+    '''
+    Queries documents from Solr using *:* query (and optional filter parameter, or list of filter parameters), sorted by
+    id, with cursor paging starting at cursor_mark. Yields each page of documents along with the cursor mark of the next
+    page. Up to PREFETCH_PAGES pages are fetched ahead by a background thread and the page size adapts to the observed
+    latency and document size. Only the fields of field_list are returned when it is given, in the JSON or CSV response
+    format.
+    '''
+    kwargs = {
+        'sort': 'id asc', 
+    }
+    add_filter_param(kwargs, filter_param)
+    field_list = get_field_list(field_list)
+    if field_list:
+        kwargs['fl'] = field_list
+    elif response_format == RESPONSE_FORMAT_CSV:
+        LOGGER.warning("get_document_pages - CSV export without a field list, all stored fields are exported as strings")
+
+    page_queue = queue.Queue(maxsize=PREFETCH_PAGES)
+    stop_event = threading.Event()
+    fetch_thread = threading.Thread(target=fetch_document_pages, args=(solr_client, kwargs, cursor_mark, page_size, max_page_size, response_format, page_queue, stop_event), daemon=True)
+    fetch_thread.start()
+    try:
+        while True:
+            page = page_queue.get()
+            if page is None:
+                break
+            if isinstance(page, Exception):
+                raise page
+            yield page
+    finally:
+        stop_event.set()
+        fetch_thread.join()
+
+def get_documents(solr_client, filter_param, page_size=ROWS_BATCH_AMOUNT, max_page_size=MAX_ROWS_BATCH_AMOUNT):
+    '''
+    Queries documents from Solr using *:* query (and optional filter parameter, or list of filter parameters). Assumes
+    there is an id field in the document that is used to sort. Uses cursor paging to gathers documents in batches, 
+    yielding them to be saved to the filesystem.
+    '''
+    doc_count = 0
+    for docs, next_cursor_mark in get_document_pages(solr_client, filter_param, page_size=page_size, max_page_size=max_page_size):
+        for doc in docs:
+            doc_count += 1
+            if doc_count % DEBUG_INTERVAL == 0:
+                LOGGER.debug('get_documents - Number of documents retrieved = %d' % doc_count)
+            yield doc
+
+def get_document_count(client, filter_param):
+    kwargs = {
+        'rows': 0,
+    }
+    add_filter_param(kwargs, filter_param)
+
+    results = client.search(ALL_DOCS_QUERY, **kwargs)
+    return results.hits
+
+def get_filter_list(*filter_params):
+    '''
+    Combines filter parameters (single values, lists, or None) into the list of fq values sent to Solr.
+    '''
+    filter_list = []
+    for filter_param in filter_params:
+        if isinstance(filter_param, (list, tuple)):
+            filter_list.extend(filter_param)
+        elif filter_param is not None:
+            filter_list.append(filter_param)
+    return filter_list if filter_list else None
+
+def quote_query_term(value):
+    return '"%s"' % str(value).replace('\\', '\\\\').replace('"', '\\"')
+
+def get_hash_partition_filters(partition_count):
+    '''
+    Splits the collection into disjoint partitions using the Solr hash query parser on the id field.
+    '''
+    return ['{!hash workers=%d worker=%d}' % (partition_count, partition) for partition in range(partition_count)]
+
+def get_range_partition_filters(solr_client, filter_param, partition_count):
+    '''
+    Splits the collection into disjoint id ranges holding roughly the same number of documents. The boundaries are the
+    ids found at evenly spaced offsets of the id sorted result set, read in a single pass over the ids (large pages of
+    the id field only, chained on the last id like CSV backup pages). Offsets (start) are not used: Solr collects
+    start + rows sorted entries per shard for each query, which does not scale to deep offsets of large collections.
+    '''
+    doc_count = get_document_count(solr_client, filter_param)
+    boundary_offsets = [partition * doc_count // partition_count for partition in range(1, partition_count)]
+    boundaries = []
+    kwargs = {'sort': 'id asc', 'fl': 'id'}
+    add_filter_param(kwargs, filter_param)
+    cursor_mark = '*'
+    page_offset = 0
+    while boundary_offsets:
+        docs, cursor_mark = search_page(solr_client, kwargs, cursor_mark, RANGE_BOUNDARY_PAGE_SIZE, RESPONSE_FORMAT_CSV)
+        if not docs:
+            break
+        while boundary_offsets and boundary_offsets[0] < page_offset + len(docs):
+            boundary = docs[boundary_offsets.pop(0) - page_offset]['id']
+            if boundary not in boundaries:
+                boundaries.append(boundary)
+        page_offset += len(docs)
+    LOGGER.debug('get_range_partition_filters - Id range boundaries %s' % json.dumps(boundaries))
+
+    lower_bounds = ['*'] + [quote_query_term(boundary) for boundary in boundaries]
+    upper_bounds = [quote_query_term(boundary) for boundary in boundaries] + ['*']
+    return ['id:[%s TO %s%s' % (lower_bound, upper_bound, '}' if upper_bound != '*' else ']') for lower_bound, upper_bound in zip(lower_bounds, upper_bounds)]
+
+def get_partition_filters(solr_client, parameters, filter_param):
+    if parameters.partition_filters_file:
+        with open(parameters.partition_filters_file) as partition_filters:
+            return [line.strip() for line in partition_filters if line.strip()]
+    if parameters.partition_mode == PARTITION_MODE_RANGE:
+        return get_range_partition_filters(solr_client, filter_param, parameters.partitions)
+    return get_hash_partition_filters(parameters.partitions)
+
+def get_zstandard():
+    '''
+    zstd compression is optional and needs the zstandard package.
+    '''
+    try:
+        import zstandard
+    except ImportError:
+        LOGGER.error("get_zstandard - zstd compression requires the zstandard package (pip install zstandard)")
+        raise ValueError('zstd compression requires the zstandard package.')
+    return zstandard
+
+def get_backup_writer(parameters, file_prefix):
+    '''
+    Creates the output writer for the backup options: -s rotates files every SPLI_DOC_AMOUNT documents unless a
+    rotation size is given.
+    '''
+    max_docs = parameters.rotate_docs
+    if max_docs is None and parameters.split_files:
+        max_docs = SPLI_DOC_AMOUNT
+    max_bytes = int(parameters.rotate_mb * 1024 * 1024) if parameters.rotate_mb else None
+    return BackupWriter(file_prefix, parameters.output_format, parameters.compression, max_docs, max_bytes)
+
+def export_documents(solr_client, filter_param, backup_writer, page_size=ROWS_BATCH_AMOUNT, max_page_size=MAX_ROWS_BATCH_AMOUNT, checkpoint=None, stream_key=None,
+                     field_list=None, response_format=RESPONSE_FORMAT_JSON):
+    '''
+    Pulls the documents matching the filter parameter and streams them to the backup writer one at a time, so memory
+    does not depend on the number of documents. When a checkpoint is given, the next cursor mark and the writer state
+    are saved after every page, and an interrupted stream continues from its last checkpoint. Returns the number of
+    documents written.
+    '''
+    cursor_mark = "*"
+    stream_state = checkpoint.get_stream(stream_key) if checkpoint is not None else None
+    if stream_state is not None:
+        if stream_state.get('complete'):
+            LOGGER.info("export_documents - Stream [%s] already completed with %d documents" % (stream_key, stream_state['doc_count']))
+            return stream_state['doc_count']
+        backup_writer.restore(stream_state)
+        cursor_mark = stream_state['cursor_mark']
+        LOGGER.info("export_documents - Resuming stream [%s] after %d documents" % (stream_key, stream_state['doc_count']))
+
+    try:
+        for docs, next_cursor_mark in get_document_pages(solr_client, filter_param, cursor_mark, page_size, max_page_size, field_list, response_format):
+            for doc in docs:
+                backup_writer.write(doc)
+            if checkpoint is not None:
+                checkpoint.update_stream(stream_key, dict(backup_writer.checkpoint(), cursor_mark=next_cursor_mark))
+            LOGGER.debug('export_documents - Number of documents retrieved = %d' % backup_writer.doc_count)
+    finally:
+        backup_writer.close()
+    if checkpoint is not None:
+        checkpoint.update_stream(stream_key, dict(backup_writer.checkpoint(), complete=True))
+    return backup_writer.doc_count
+
+def export_partition(parameters, partition, partition_filter, filter_param, backup_id, checkpoint):
+    '''
+    Exports a single partition with its own Solr client and cursor stream. Output files are named after the partition.
+    '''
+    solr_client = get_solr_client(parameters.user_creds_file, parameters.user_creds_key, parameters.cluster_id, parameters.collection_name)
+    file_prefix = "%s/%s_%s_p%d" % (parameters.output_dir, parameters.collection_name, backup_id, partition + 1)
+    start_time = time.time()
+    doc_count = export_documents(solr_client, get_filter_list(filter_param, partition_filter), get_backup_writer(parameters, file_prefix),
+                                 parameters.page_size, parameters.max_page_size, checkpoint, 'p%d' % (partition + 1), parameters.field_list, parameters.response_format)
+    LOGGER.info("export_partition - Partition %d [%s] exported %d documents in %.1f seconds" % (partition + 1, partition_filter, doc_count, time.time() - start_time))
+    return doc_count
+
+def export_partitions(pysolr_client, parameters, partition_filters, filter_param, backup_id, checkpoint):
+    '''
+    Parallel export: splits the collection into disjoint partitions (hash of the id, id ranges, or a list of filters
+    provided by the user), each exported concurrently with its own cursor stream into its own files. The total number
+    of exported documents is checked against the document count of the collection.
+    '''
+    LOGGER.info("export_partitions - Exporting %d partitions with %d threads" % (len(partition_filters), min(len(partition_filters), parameters.partition_threads)))
+    partition_counts = {}
+    with ThreadPoolExecutor(max_workers=min(len(partition_filters), parameters.partition_threads)) as executor:
+        partition_tasks = {executor.submit(export_partition, parameters, partition, partition_filter, filter_param, backup_id, checkpoint): partition for partition, partition_filter in enumerate(partition_filters)}
+        for partition_task in as_completed(partition_tasks):
+            partition_counts[partition_tasks[partition_task]] = partition_task.result()
+
+    exported_count = sum(partition_counts.values())
+    expected_count = get_document_count(pysolr_client, filter_param)
+    if exported_count != expected_count:
+        LOGGER.error("export_partitions - Exported %d documents but the collection has %d, partitions may overlap, miss documents or the collection changed during the backup" % (exported_count, expected_count))
+    else:
+        LOGGER.info("export_partitions - Exported %d documents, matching the collection document count" % exported_count)
+    return exported_count
+
+def get_max_field_value(solr_client, field_name, filter_param):
+    kwargs = {'sort': '%s desc' % field_name, 'rows': 1, 'fl': field_name}
+    add_filter_param(kwargs, filter_param)
+    res = solr_client.search(ALL_DOCS_QUERY, **kwargs)
+    return res.docs[0].get(field_name) if res.docs else None
+
+def load_backup_chain(chain_file_name):
+    if not os.path.isfile(chain_file_name):
+        return []
+    with open(chain_file_name, encoding='utf8') as chain_file:
+        return json.load(chain_file)
+
+def save_json_file(file_name, content):
+    '''
+    Replaces a small JSON state file atomically, so that it is never left partially written.
+    '''
+    with open(file_name + '.tmp', 'w', encoding='utf8') as temp_file:
+        json.dump(content, temp_file, indent=4)
+    os.replace(file_name + '.tmp', file_name)
+
+def create_backup_info(pysolr_client, parameters, backup_chain):
+    '''
+    Describes a new backup: its options, the filter of the documents to export and the partitions. Every backup records
+    the highest value of the since field at its start. An incremental backup only exports the documents with a since
+    field value above the one recorded by the previous completed backup of the chain (full or incremental), and up
+    to its own. Documents deleted from the collection are not tracked by incremental backups.
+    '''
+    backup_info = {
+        'backup_id': time.strftime(OUTPUT_TSTAMP_FORMAT),
+        'type': BACKUP_TYPE_FULL,
+        'parent': None,
+        'since_field': parameters.since_field,
+        'since_value': None,
+        'max_value': get_max_field_value(pysolr_client, parameters.since_field, parameters.filter_param),
+        'options': {option: getattr(parameters, option) for option in BACKUP_OPTIONS},
+        'complete': False,
+        'streams': {},
+    }
+    filter_param = parameters.filter_param
+    if parameters.incremental:
+        previous_backups = [backup for backup in backup_chain if backup['since_field'] == parameters.since_field and backup['options']['filter_param'] == parameters.filter_param]
+        if not previous_backups or previous_backups[-1]['max_value'] is None:
+            LOGGER.warning("create_backup_info - No previous backup to continue from, running a full backup")
+        else:
+            parent_backup = previous_backups[-1]
+            backup_info.update({'type': BACKUP_TYPE_INCREMENTAL, 'parent': parent_backup['backup_id'], 'since_value': parent_backup['max_value']})
+            filter_param = get_filter_list(filter_param, '%s:{%s TO %s]' % (parameters.since_field, parent_backup['max_value'],
+                                                                          backup_info['max_value'] if backup_info['max_value'] is not None else '*'))
+    backup_info['filter'] = filter_param
+    if parameters.partitions > 1 or parameters.partition_filters_file:
+        backup_info['partition_filters'] = get_partition_filters(pysolr_client, parameters, filter_param)
+    return backup_info
+
+def backup_driver(parameters):
+    '''
+    Uses a pysolr client to pull documents from Solr and store them to the filesystem (as json files). Documents are stored
+    either in batches (if split parameter used) or as a single file (json array). Documents pulled can be filtered by providing
+    a filter parameter. Progress is checkpointed after every page so that an interrupted backup can be resumed, and
+    completed backups are chained in a manifest used by incremental backups.
+    '''
+    LOGGER.info("backup_driver - Starting Solr backup, using cluser [%s] and collection [%s]. Saving documents to [%s]" % (parameters.cluster_id, parameters.collection_name, parameters.output_dir))
+    LOGGER.debug("backup_driver - Filter set to [%s], Split files is [%s]" % (parameters.filter_param, parameters.split_files))
+
+    if not os.path.isdir(parameters.output_dir):
+        LOGGER.error("backup_driver - Specified output is not a directory." )
+        raise ValueError("Could not find the output directory.")
+
+    chain_file_name = os.path.join(parameters.output_dir, BACKUP_CHAIN_FILE_NAME % parameters.collection_name)
+    backup_chain = load_backup_chain(chain_file_name)
+    checkpoint = None
+    if parameters.resume:
+        checkpoint = BackupCheckpoint.find_interrupted(parameters.output_dir, parameters.collection_name)
+        if checkpoint is None:
+            LOGGER.error("backup_driver - No interrupted backup of collection [%s] found in [%s]" % (parameters.collection_name, parameters.output_dir))
+            raise ValueError("Could not find a backup to resume.")
+        #Resumed backups keep the options of the interrupted run, so that their output stays consistent
+        for option, value in checkpoint.backup_info['options'].items():
+            setattr(parameters, option, value)
+        LOGGER.info("backup_driver - Resuming %s backup [%s]" % (checkpoint.backup_info['type'], checkpoint.backup_info['backup_id']))
+
+    if parameters.compression == COMPRESSION_ZSTD:
+        get_zstandard()
+
+    pysolr_client = get_solr_client(parameters.user_creds_file, parameters.user_creds_key, parameters.cluster_id, parameters.collection_name)
+
+    LOGGER.info("backup_driver - Total number of documents in index: %d" % get_document_count(pysolr_client, None))
+    if checkpoint is None:
+        backup_info = create_backup_info(pysolr_client, parameters, backup_chain)
+        checkpoint = BackupCheckpoint(os.path.join(parameters.output_dir, "%s_%s%s" % (parameters.collection_name, backup_info['backup_id'], CHECKPOINT_FILE_EXTENSION)), backup_info)
+        checkpoint.save()
+    backup_info = checkpoint.backup_info
+    if backup_info['filter'] is not None:
+        LOGGER.info("backup_driver - Total number of documents in filtered request: %d" % get_document_count(pysolr_client, backup_info['filter']))
+
+    #Large indexes are split into partitions that are pulled in parallel, each with its own cursor
+    if backup_info.get('partition_filters'):
+        export_partitions(pysolr_client, parameters, backup_info['partition_filters'], backup_info['filter'], backup_info['backup_id'], checkpoint)
+    else:
+        file_prefix = "%s/%s_%s" % (parameters.output_dir, parameters.collection_name, backup_info['backup_id'])
+        export_documents(pysolr_client, backup_info['filter'], get_backup_writer(parameters, file_prefix), parameters.page_size, parameters.max_page_size, checkpoint, 'all',
+                         parameters.field_list, parameters.response_format)
+
+    checkpoint.complete()
+    chain_entry = {key: value for key, value in backup_info.items() if key != 'streams'}
+    chain_entry['files'] = [os.path.basename(file_name) for stream_state in backup_info['streams'].values() for file_name in stream_state['file_names']]
+    chain_entry['doc_count'] = sum(stream_state['doc_count'] for stream_state in backup_info['streams'].values())
+    backup_chain.append(chain_entry)
+    save_json_file(chain_file_name, backup_chain)
+    LOGGER.info("backup_driver - Completed %s backup [%s] with %d documents" % (chain_entry['type'], chain_entry['backup_id'], chain_entry['doc_count']))
+    return chain_entry
+
+def open_backup_file(file_name):
+    '''
+    Opens a backup file for reading as text, decompressing gzip (.gz) and zstd (.zst) files. Concatenated gzip members
+    and zstd frames (written at each backup checkpoint) are read as a single stream.
+    '''
+    if file_name.endswith(COMPRESSION_EXTENSIONS[COMPRESSION_GZIP]):
+        return gzip.open(file_name, 'rt', encoding='utf8')
+    if file_name.endswith(COMPRESSION_EXTENSIONS[COMPRESSION_ZSTD]):
+        compressed_file = get_zstandard().ZstdDecompressor().stream_reader(open(file_name, 'rb'), read_across_frames=True, closefd=True)
+        return io.TextIOWrapper(compressed_file, encoding='utf8')
+    return open(file_name, 'r', encoding='utf8')
+
+def iter_backup_documents(file_name):
+    '''
+    Yields the documents of a backup file, either NDJSON (one document per line) or a JSON array.
+    '''
+    with open_backup_file(file_name) as backup_file:
+        for doc in iter_json_documents(backup_file):
+            yield doc
+
+def get_restore_backups(backup_chain):
+    '''
+    Returns the backups of a chain that hold the latest state of the collection, oldest first: the most recent backup and
+    the backups it continues through their parent, back to its full backup. Full backups replaced by later ones (and
+    the incremental backups between them) are skipped, as are backups with another since field or filter.
+    '''
+    restore_backups = []
+    position = len(backup_chain) - 1
+    while position >= 0:
+        backup = backup_chain[position]
+        restore_backups.append(backup)
+        if backup['type'] == BACKUP_TYPE_FULL:
+            break
+        #Backup ids are timestamps, the parent is the most recent backup with its id before this one
+        position -= 1
+        while position >= 0 and backup_chain[position]['backup_id'] != backup['parent']:
+            position -= 1
+        if position < 0:
+            LOGGER.warning("get_restore_backups - Parent backup [%s] of backup [%s] not found in the chain" % (backup['parent'], backup['backup_id']))
+    LOGGER.info("get_restore_backups - Restoring backups [%s]" % ', '.join(backup['backup_id'] for backup in reversed(restore_backups)))
+    return list(reversed(restore_backups))
+
+def get_backup_files(restore_location, collection_name=None):
+    '''
+    Returns the backup files to restore: the given file, or for a directory the files of the latest backups of its chain
+    (see get_restore_backups), the full backup before the incremental backups that follow it. Only the chain of
+    collection_name is read when given, otherwise the directory must hold a single chain. Directories without a backup
+    chain are restored from all their backup files, sorted by name.
+    '''
+    if os.path.isfile(restore_location):
+        return [restore_location]
+    if not os.path.isdir(restore_location):
+        LOGGER.error("get_backup_files - Restore location is not a file nor a directory [%s]" % restore_location)
+        raise ValueError("Could not find the restore location.")
+    backup_files = []
+    chain_file_names = sorted(file_name for file_name in os.listdir(restore_location) if file_name.endswith(BACKUP_CHAIN_FILE_NAME % ''))
+    chain_collections = [file_name[:-len(BACKUP_CHAIN_FILE_NAME % '')] for file_name in chain_file_names]
+    if collection_name is not None and chain_file_names:
+        if collection_name not in chain_collections:
+            LOGGER.error("get_backup_files - No backup chain of collection [%s] in [%s], found the chains of [%s]" % (collection_name, restore_location, ', '.join(chain_collections)))
+            raise ValueError("Could not find the backups of collection [%s]." % collection_name)
+        chain_file_names = [BACKUP_CHAIN_FILE_NAME % collection_name]
+    elif len(chain_file_names) > 1:
+        LOGGER.error("get_backup_files - Backup chains of several collections in [%s]: [%s]" % (restore_location, ', '.join(chain_collections)))
+        raise ValueError("Several collections are backed up in the restore location, a collection name is required.")
+    for chain_file_name in chain_file_names:
+        for backup in get_restore_backups(load_backup_chain(os.path.join(restore_location, chain_file_name))):
+            backup_files.extend(os.path.join(restore_location, file_name) for file_name in backup['files'])
+    if not chain_file_names:
+        for file_name in sorted(os.listdir(restore_location)):
+            if file_name.endswith(BACKUP_FILE_EXTENSIONS) and not file_name.endswith(CHECKPOINT_FILE_EXTENSION):
+                backup_files.append(os.path.join(restore_location, file_name))
+    return backup_files
+
+def send_batch(solr_client, docs, commit_within):
+    '''
+    Adds a batch of documents to Solr, leaving the commit to commitWithin. Failed batches are retried up to
+    RESTORE_MAX_RETRIES times with exponential backoff. Returns True if the batch was added.
+    '''
+    attempt = 0
+    while True:
+        try:
+            solr_client.add(docs, commit=False, commitWithin=commit_within)
+            return True
+        except (get_pysolr().SolrError, IOError) as e:
+            if attempt >= RESTORE_MAX_RETRIES:
+                LOGGER.error("send_batch - Batch of %d documents failed after %d attempts: %s" % (len(docs), attempt + 1, str(e)))
+                return False
+            LOGGER.warning("send_batch - Batch of %d documents failed (attempt %d), retrying: %s" % (len(docs), attempt + 1, str(e)))
+            time.sleep(min(RETRY_MAX_SLEEP_TIME, RETRY_SLEEP_TIME * (2 ** attempt)))
+            attempt += 1
+
+def restore_driver(parameters):
+    '''
+    Streams documents from backup files (JSON array or NDJSON, optionally compressed) into a Solr collection. Documents
+    are sent in batches of parameters.batch_size by parameters.restore_threads concurrent senders (with at most twice as
+    many batches read ahead), committed by Solr through commitWithin plus a single commit at the end. Batches that still
+    fail after retries are written to a NDJSON file that can be restored again.
+    '''
+    LOGGER.info("restore_driver - Starting Solr restore, using cluser [%s] and collection [%s]. Restoring documents from [%s]" % (parameters.cluster_id, parameters.collection_name, parameters.restore_location))
+    backup_files = get_backup_files(parameters.restore_location, parameters.backup_collection_name or parameters.collection_name)
+    LOGGER.info("restore_driver - Number of backup files to restore: %d" % len(backup_files))
+    if any(file_name.endswith(COMPRESSION_EXTENSIONS[COMPRESSION_ZSTD]) for file_name in backup_files):
+        get_zstandard()
+
+    thread_clients = threading.local()
+    def send_thread_batch(docs):
+        #pysolr clients are not shared between sender threads
+        if not hasattr(thread_clients, 'solr_client'):
+            thread_clients.solr_client = get_solr_client(parameters.user_creds_file, parameters.user_creds_key, parameters.cluster_id, parameters.collection_name)
+        return send_batch(thread_clients.solr_client, docs, parameters.commit_within)
+
+    failed_dir = parameters.output_dir if parameters.output_dir else os.path.dirname(os.path.abspath(parameters.restore_location))
+    failed_file_name = os.path.join(failed_dir, "%s_restore_failed_%s.%s" % (parameters.collection_name, time.strftime(OUTPUT_TSTAMP_FORMAT), OUTPUT_FORMAT_NDJSON))
+    failed_file = None
+    restore_stats = {'documents_read': 0, 'documents_restored': 0, 'documents_failed': 0, 'batches_failed': 0}
+    start_time = time.time()
+
+    def record_batch_result(batch_task):
+        nonlocal failed_file
+        docs = in_flight_batches.pop(batch_task)
+        if batch_task.result():
+            restore_stats['documents_restored'] += len(docs)
+            return
+        restore_stats['documents_failed'] += len(docs)
+        restore_stats['batches_failed'] += 1
+        if failed_file is None:
+            failed_file = open(failed_file_name, 'w', encoding='utf8')
+        for doc in docs:
+            failed_file.write(json.dumps(doc) + '\n')
+
+    in_flight_batches = {}
+    try:
+        with ThreadPoolExecutor(max_workers=parameters.restore_threads) as executor:
+            batch = []
+            for file_name in backup_files:
+                LOGGER.debug("restore_driver - Restoring backup file %s" % file_name)
+                for doc in iter_backup_documents(file_name):
+                    for field_name in RESTORE_EXCLUDED_FIELDS:
+                        doc.pop(field_name, None)
+                    batch.append(doc)
+                    restore_stats['documents_read'] += 1
+                    if len(batch) >= parameters.batch_size:
+                        in_flight_batches[executor.submit(send_thread_batch, batch)] = batch
+                        batch = []
+                        if len(in_flight_batches) >= 2 * parameters.restore_threads:
+                            completed_batches, _ = wait(in_flight_batches, return_when=FIRST_COMPLETED)
+                            for batch_task in completed_batches:
+                                record_batch_result(batch_task)
+                    if restore_stats['documents_read'] % RESTORE_PROGRESS_INTERVAL == 0:
+                        LOGGER.info("restore_driver - Documents read: %d, restored: %d (%.1f docs/sec)" % (restore_stats['documents_read'], restore_stats['documents_restored'], restore_stats['documents_restored'] / (time.time() - start_time)))
+            if batch:
+                in_flight_batches[executor.submit(send_thread_batch, batch)] = batch
+            for batch_task in as_completed(list(in_flight_batches)):
+                record_batch_result(batch_task)
+    finally:
+        if failed_file is not None:
+            failed_file.close()
+            LOGGER.warning("restore_driver - Documents of failed batches written to file [%s]" % failed_file_name)
+
+    get_solr_client(parameters.user_creds_file, parameters.user_creds_key, parameters.cluster_id, parameters.collection_name).commit()
+    elapsed_time = time.time() - start_time
+    restore_stats['elapsed_seconds'] = round(elapsed_time, 3)
+    restore_stats['documents_per_second'] = round(restore_stats['documents_restored'] / elapsed_time, 1) if elapsed_time else None
+    LOGGER.info("restore_driver - Finished restore, statistics [%s]" % json.dumps(restore_stats))
+    return restore_stats
+
+def iter_block_documents(block_text):
+    '''
+    Yields the documents of a backup file block. Blocks of JSON array files may start with the opening bracket or the
+    comma separating them from the previous document, and the last one ends with the closing bracket.
+    '''
+    decoder = json.JSONDecoder()
+    position = 0
+    while True:
+        while position < len(block_text) and block_text[position] in JSON_BLOCK_SEPARATORS:
+            position += 1
+        if position >= len(block_text) or block_text[position] == ']':
+            return
+        doc, position = decoder.raw_decode(block_text, position)
+        yield doc
+
+def lookup_documents(backup_location, first_id, last_id=None, collection_name=None):
+    '''
+    Finds the documents with an id between first_id and last_id (inclusive, only first_id when last_id is not given) in
+    a backup file or directory (in the backup chain of collection_name), reading only the blocks of each file that can
+    hold them according to its index. When the backups of a chain hold several versions of a document, the one of the
+    most recent backup is returned. Returns the documents sorted by id.
+    '''
+    if last_id is None:
+        last_id = first_id
+    docs = {}
+    for file_name in get_backup_files(backup_location, collection_name):
+        for doc in BackupIndex(file_name).find(first_id, last_id):
+            docs[doc['id']] = doc
+    return [docs[doc_id] for doc_id in sorted(docs)]
+
+def lookup_driver(parameters):
+    '''
+    Prints the backed up documents with the requested id (or id range) as NDJSON.
+    '''
+    start_time = time.time()
+    docs = lookup_documents(parameters.output_dir, parameters.lookup_id, parameters.lookup_to_id, parameters.collection_name)
+    for doc in docs:
+        print(json.dumps(doc))
+    LOGGER.info("lookup_driver - Found %d documents in %.1f milliseconds" % (len(docs), (time.time() - start_time) * 1000))
+    return docs
+
+class BackupWriter:
+    '''
+    Streams documents to backup files one at a time, either as a JSON array (the original format) or as NDJSON (one
+    document per line), optionally compressed with gzip or zstd. Files are named file_prefix_N.<format>[.gz|.zst] and
+    rotated once they hold max_docs documents or max_bytes bytes of (uncompressed) output. A file is only created when
+    its first document is written. Each checkpoint ends the current gzip member / zstd frame (readers decompress the
+    concatenated members as one stream), so a file can be truncated back to its last checkpoint and continued.
+
+    Every file gets a sidecar index (file name + .idx, NDJSON) with one line per block of about INDEX_BLOCK_BYTES of
+    output: the id of its first document and its byte offset in the file. Compressed blocks start a new gzip member /
+    zstd frame, so any block can be read on its own. Documents are written sorted by id, so the index locates a document
+    or an id range without reading the rest of the file (see BackupIndex).
+    '''
+    def __init__(self, file_prefix, output_format=OUTPUT_FORMAT_JSON, compression=None, max_docs=None, max_bytes=None):
+        self.file_prefix = file_prefix
+        self.output_format = output_format
+        self.compression = compression
+        self.max_docs = max_docs
+        self.max_bytes = max_bytes
+        self.raw_file = None
+        self.output_stream = None
+        self.index_file = None
+        self.block_byte_count = None
+        self.last_id = None
+        self.file_names = []
+        self.file_doc_count = 0
+        self.file_byte_count = 0
+        self.doc_count = 0
+
+    def open_file(self):
+        file_name = "%s_%d.%s%s" % (self.file_prefix, len(self.file_names) + 1, self.output_format, COMPRESSION_EXTENSIONS[self.compression])
+        self.raw_file = open(file_name, 'wb')
+        self.index_file = open(file_name + INDEX_FILE_EXTENSION, 'wb')
+        self.file_names.append(file_name)
+        self.file_doc_count = 0
+        self.file_byte_count = 0
+        self.block_byte_count = None
+        LOGGER.debug("BackupWriter - Writing output file %s" % file_name)
+
+    def open_stream(self):
+        if self.compression == COMPRESSION_GZIP:
+            self.output_stream = gzip.GzipFile(fileobj=self.raw_file, mode='wb', compresslevel=GZIP_COMPRESS_LEVEL)
+        elif self.compression == COMPRESSION_ZSTD:
+            self.output_stream = get_zstandard().ZstdCompressor(level=ZSTD_COMPRESS_LEVEL).stream_writer(self.raw_file, closefd=False)
+        else:
+            self.output_stream = self.raw_file
+
+    def close_stream(self):
+        if self.output_stream is not None and self.output_stream is not self.raw_file:
+            self.output_stream.close()
+        self.output_stream = None
+
+    def write_index_entry(self, index_entry):
+        if self.index_file is not None:
+            self.index_file.write((json.dumps(index_entry) + '\n').encode('utf8'))
+
+    def start_block(self, doc):
+        self.close_stream()
+        self.write_index_entry({'id': doc.get('id'), 'offset': self.raw_file.tell()})
+        self.block_byte_count = 0
+
+    def write(self, doc):
+        if self.raw_file is None:
+            self.open_file()
+        if self.block_byte_count is None or self.block_byte_count >= INDEX_BLOCK_BYTES:
+            self.start_block(doc)
+        if self.output_stream is None:
+            self.open_stream()
+        if self.output_format == OUTPUT_FORMAT_NDJSON:
+            line = json.dumps(doc) + '\n'
+        else:
+            line = ('[\n' if self.file_doc_count == 0 else ',\n') + json.dumps(doc, indent=4)
+        line = line.encode('utf8')
+        self.output_stream.write(line)
+        self.file_doc_count += 1
+        self.file_byte_count += len(line)
+        self.block_byte_count += len(line)
+        self.last_id = doc.get('id')
+        self.doc_count += 1
+        if (self.max_docs and self.file_doc_count >= self.max_docs) or (self.max_bytes and self.file_byte_count >= self.max_bytes):
+            self.close_file()
+
+    def close_file(self):
+        if self.raw_file is not None:
+            if self.output_format == OUTPUT_FORMAT_JSON:
+                if self.output_stream is None:
+                    self.open_stream()
+                self.output_stream.write(b'\n]')
+            self.close_stream()
+            self.raw_file.close()
+            self.write_index_entry({'max_id': self.last_id, 'doc_count': self.file_doc_count})
+            if self.index_file is not None:
+                self.index_file.close()
+                self.index_file = None
+            LOGGER.debug("BackupWriter - Closed output file %s with %d documents" % (self.file_names[-1], self.file_doc_count))
+            self.raw_file = None
+
+    def checkpoint(self):
+        '''
+        Flushes everything written so far to disk and returns the writer state to save in the backup checkpoint.
+        '''
+        file_offset = None
+        index_offset = None
+        if self.raw_file is not None:
+            self.close_stream()
+            self.raw_file.flush()
+            os.fsync(self.raw_file.fileno())
+            file_offset = self.raw_file.tell()
+        if self.index_file is not None:
+            self.index_file.flush()
+            os.fsync(self.index_file.fileno())
+            index_offset = self.index_file.tell()
+        return {'file_names': list(self.file_names), 'file_doc_count': self.file_doc_count, 'file_byte_count': self.file_byte_count,
+                'file_offset': file_offset, 'index_offset': index_offset, 'last_id': self.last_id, 'doc_count': self.doc_count}
+
+    def restore(self, state):
+        '''
+        Continues from a checkpointed writer state: the file being written and its index are truncated back to the
+        checkpoint offsets (dropping anything written after it) and reopened for writing. Files checkpointed without an
+        index offset are continued without an index.
+        '''
+        self.file_names = list(state['file_names'])
+        self.doc_count = state['doc_count']
+        if state['file_offset'] is not None:
+            self.raw_file = open(self.file_names[-1], 'r+b')
+            self.raw_file.truncate(state['file_offset'])
+            self.raw_file.seek(state['file_offset'])
+            if state.get('index_offset') is not None:
+                self.index_file = open(self.file_names[-1] + INDEX_FILE_EXTENSION, 'r+b')
+                self.index_file.truncate(state['index_offset'])
+                self.index_file.seek(state['index_offset'])
+            self.last_id = state.get('last_id')
+            self.file_doc_count = state['file_doc_count']
+            self.file_byte_count = state['file_byte_count']
+
+    def close(self):
+        self.close_file()
+
+class BackupCheckpoint:
+    '''
+    Progress of a backup, saved as <collection>_<backup_id>.checkpoint.json next to its output: the backup options,
+    the filters used, and for each cursor stream (a single one, or one per partition) the next cursor mark, the number of
+    documents written and the state of its output files. Updated after every page written and marked complete at the end.
+    '''
+    def __init__(self, checkpoint_file_name, backup_info=None):
+        self.checkpoint_file_name = checkpoint_file_name
+        self.lock = threading.Lock()
+        if backup_info is None:
+            with open(checkpoint_file_name, encoding='utf8') as checkpoint_file:
+                backup_info = json.load(checkpoint_file)
+        self.backup_info = backup_info
+
+    @staticmethod
+    def find_interrupted(output_dir, collection_name):
+        '''
+        Returns the checkpoint of the most recent backup of the collection that did not complete, or None. Checkpoints of
+        other collections whose name starts with the same prefix (collection_v2 for collection) are not matched.
+        '''
+        checkpoint_pattern = re.compile(CHECKPOINT_FILE_PATTERN % re.escape(collection_name))
+        checkpoint_file_names = sorted(file_name for file_name in os.listdir(output_dir) if checkpoint_pattern.fullmatch(file_name))
+        for checkpoint_file_name in reversed(checkpoint_file_names):
+            checkpoint = BackupCheckpoint(os.path.join(output_dir, checkpoint_file_name))
+            if not checkpoint.backup_info['complete']:
+                return checkpoint
+        return None
+
+    def get_stream(self, stream_key):
+        with self.lock:
+            return self.backup_info['streams'].get(stream_key)
+
+    def update_stream(self, stream_key, stream_state):
+        with self.lock:
+            self.backup_info['streams'][stream_key] = stream_state
+            save_json_file(self.checkpoint_file_name, self.backup_info)
+
+    def complete(self):
+        with self.lock:
+            self.backup_info['complete'] = True
+            save_json_file(self.checkpoint_file_name, self.backup_info)
+
+    def save(self):
+        with self.lock:
+            save_json_file(self.checkpoint_file_name, self.backup_info)
+
+class BackupIndex:
+    '''
+    Reads the sidecar index of a backup file (see BackupWriter). Only the first and last lines of the index are read to
+    get the id range of the file, the block list is loaded when the range can hold the requested ids. Files without an
+    index (written before indexes existed) are scanned.
+    '''
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.index_file_name = file_name + INDEX_FILE_EXTENSION
+        self.block_ids = None
+        self.block_offsets = None
+
+    def get_id_range(self):
+        '''
+        Returns the first and last ids of the file. The last id is None if the file was not closed (interrupted backup).
+        '''
+        with open(self.index_file_name, 'rb') as index_file:
+            first_entry = json.loads(index_file.readline())
+            index_file.seek(max(0, os.fstat(index_file.fileno()).st_size - JSON_READ_CHUNK_SIZE))
+            last_entry = json.loads(index_file.read().rstrip(b'\n').rsplit(b'\n', 1)[-1])
+        return first_entry['id'], last_entry.get('max_id')
+
+    def load_blocks(self):
+        self.block_ids = []
+        self.block_offsets = []
+        with open(self.index_file_name, 'rb') as index_file:
+            for line in index_file:
+                index_entry = json.loads(line)
+                if 'offset' in index_entry:
+                    self.block_ids.append(index_entry['id'])
+                    self.block_offsets.append(index_entry['offset'])
+
+    def read_block(self, backup_file, block_number):
+        backup_file.seek(self.block_offsets[block_number])
+        if block_number + 1 < len(self.block_offsets):
+            block_data = backup_file.read(self.block_offsets[block_number + 1] - self.block_offsets[block_number])
+        else:
+            block_data = backup_file.read()
+        if self.file_name.endswith(COMPRESSION_EXTENSIONS[COMPRESSION_GZIP]):
+            block_data = gzip.decompress(block_data)
+        elif self.file_name.endswith(COMPRESSION_EXTENSIONS[COMPRESSION_ZSTD]):
+            block_data = get_zstandard().ZstdDecompressor().stream_reader(io.BytesIO(block_data), read_across_frames=True).read()
+        return block_data.decode('utf8')
+
+    def find(self, first_id, last_id):
+        '''
+        Yields the documents of the file with an id between first_id and last_id (inclusive).
+        '''
+        if not os.path.isfile(self.index_file_name) or not os.path.getsize(self.index_file_name):
+            LOGGER.warning("BackupIndex - No index for backup file %s, scanning it" % self.file_name)
+            for doc in iter_backup_documents(self.file_name):
+                if first_id <= doc['id'] <= last_id:
+                    yield doc
+            return
+
+        min_id, max_id = self.get_id_range()
+        if last_id < min_id or (max_id is not None and first_id > max_id):
+            return
+        if self.block_ids is None:
+            self.load_blocks()
+        block_number = max(0, bisect.bisect_right(self.block_ids, first_id) - 1)
+        with open(self.file_name, 'rb') as backup_file:
+            while block_number < len(self.block_ids) and self.block_ids[block_number] <= last_id:
+                for doc in iter_block_documents(self.read_block(backup_file, block_number)):
+                    if doc['id'] > last_id:
+                        return
+                    if doc['id'] >= first_id:
+                        yield doc
+                block_number += 1
+
+def main(argv=None, command=COMMAND_BACKUP):
+    '''
+    Parses the options of the backup, restore or lookup command (argv, or the command line) and runs it in this
+    process. Returns the result of the driver: the backup chain entry, the restore statistics or the documents found.
+    '''
+    parser = argparse.ArgumentParser(prog="python -m misc_scripts %s" % command, description=COMMAND_DESCRIPTIONS[command])
+    if command != COMMAND_LOOKUP:
+        parser.add_argument('-creds-file', dest='user_creds_file', required=True, help='Credentials file name')
+        parser.add_argument('-creds-key', dest='user_creds_key', required=True, help='Credentials file key')
+        parser.add_argument('-cid', dest='cluster_id', required=True, help='Cluster ID.')
+        parser.add_argument('-cname', dest='collection_name', required=True, help='Collection name.')
+    if command == COMMAND_BACKUP:
+        parser.add_argument('-output-location', dest='output_dir', required=True, help='Directory to store output from Solr')
+        parser.add_argument('-s', dest="split_files", action='store_true', help='Split output into multiple files.')
+        parser.add_argument('-f', dest='filter_param', help='Filter value to pass to fq parameter (quote multispace)')
+        parser.add_argument('-format', dest='output_format', choices=OUTPUT_FORMATS, default=OUTPUT_FORMAT_JSON, help='Output format: JSON array or NDJSON (one document per line)')
+        parser.add_argument('-compress', dest='compression', choices=(COMPRESSION_GZIP, COMPRESSION_ZSTD), help='Compress output files')
+        parser.add_argument('-rotate-docs', dest='rotate_docs', type=int, help='Start a new output file after this number of documents')
+        parser.add_argument('-rotate-mb', dest='rotate_mb', type=float, help='Start a new output file after this many MB of (uncompressed) output')
+        parser.add_argument('-fl', dest='field_list', help='Comma separated list of fields to export (the id is always exported)')
+        parser.add_argument('-response-format', dest='response_format', choices=RESPONSE_FORMATS, default=RESPONSE_FORMAT_JSON, help='Solr response format of exported pages, csv responses are about half the size of json but only suit flat schemas')
+        parser.add_argument('-rows', dest='page_size', type=int, default=ROWS_BATCH_AMOUNT, help='Initial number of documents requested per page')
+        parser.add_argument('-max-rows', dest='max_page_size', type=int, default=MAX_ROWS_BATCH_AMOUNT, help='Maximum number of documents requested per page')
+        parser.add_argument('-resume', dest='resume', action='store_true', help='Resume the last interrupted backup of the collection in the output location')
+        parser.add_argument('-incremental', dest='incremental', action='store_true', help='Only export documents changed since the previous backup in the output location')
+        parser.add_argument('-since-field', dest='since_field', default=DEFAULT_SINCE_FIELD, help='Field used to find changed documents (_version_ or a timestamp field)')
+        parser.add_argument('-p', dest='partitions', type=int, default=1, help='Number of partitions exported in parallel')
+        parser.add_argument('-pmode', dest='partition_mode', choices=PARTITION_MODES, default=PARTITION_MODE_HASH, help='Partition by hash of the id or by id ranges (balanced ranges, found by reading every id once)')
+        parser.add_argument('-pfile', dest='partition_filters_file', help='File with one fq filter per line, each one exported as a partition')
+        parser.add_argument('-pthreads', dest='partition_threads', type=int, default=MAX_PARTITION_THREADS, help='Maximum number of partitions exported concurrently')
+    elif command == COMMAND_RESTORE:
+        parser.add_argument('-restore-location', dest='restore_location', required=True, help='Backup file or directory to restore into the collection')
+        parser.add_argument('-backup-cname', dest='backup_collection_name', help='Collection whose backups are restored from the restore location (default: -cname)')
+        parser.add_argument('-output-location', dest='output_dir', help='Directory to store the documents of failed batches (default: the directory of the restore location)')
+        parser.add_argument('-batch-size', dest='batch_size', type=int, default=RESTORE_BATCH_SIZE, help='Number of documents per restore batch')
+        parser.add_argument('-rthreads', dest='restore_threads', type=int, default=RESTORE_THREADS, help='Number of concurrent restore batch senders')
+        parser.add_argument('-commit-within', dest='commit_within', type=int, default=RESTORE_COMMIT_WITHIN, help='commitWithin (milliseconds) of restored batches')
+    else:
+        parser.add_argument('-output-location', dest='output_dir', required=True, help='Output location of the backup')
+        parser.add_argument('-cname', dest='collection_name', help='Collection whose backups are searched, required when the output location holds the backups of several collections')
+        parser.add_argument('-id', dest='lookup_id', required=True, help='Print the document with this id')
+        parser.add_argument('-to-id', dest='lookup_to_id', help='Print all documents with an id from the -id one to this one')
+    parser.add_argument('-d', dest="log_level", help="Set DEBUG logging level", action="store_const",
+                        const=logging.DEBUG, default=logging.INFO)
+
+    args = parser.parse_args(argv)
+    initialize_logger(args.log_level)
+    if command == COMMAND_LOOKUP:
+        return lookup_driver(args)
+    if command == COMMAND_RESTORE:
+        return restore_driver(args)
+    return backup_driver(args)
@@ -0,0 +1,50 @@
+import io
+import os
+import sys
+import json
+import unittest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TESTS_DIR))
+
+from misc_scripts import common
+
+class CountingReader(io.StringIO):
+    '''
+    In-memory file counting its reads, each read past a partial document is followed by a decode of the whole buffer.
+    '''
+    def __init__(self, text):
+        super().__init__(text)
+        self.read_count = 0
+
+    def read(self, size=-1):
+        self.read_count += 1
+        return super().read(size)
+
+class IterJsonDocumentsTest(unittest.TestCase):
+    def setUp(self):
+        #About 6 MB once serialized
+        self.large_doc = {'id': 'large', 'items': [{'key': item, 'value': 'value %d' % item} for item in range(200000)]}
+
+    def test_large_single_document(self):
+        json_file = CountingReader(json.dumps(self.large_doc))
+        self.assertEqual(list(common.iter_json_documents(json_file)), [self.large_doc])
+        #Reads grow geometrically: a handful of decodes instead of one per 64 KB chunk (about a hundred)
+        self.assertLess(json_file.read_count, 10)
+
+    def test_large_array_element(self):
+        docs = [{'id': 'first'}, self.large_doc, {'id': 'last'}]
+        json_file = CountingReader(json.dumps(docs))
+        self.assertEqual(list(common.iter_json_documents(json_file)), docs)
+        self.assertLess(json_file.read_count, 12)
+
+    def test_values_split_between_reads(self):
+        docs = [12345678, {'id': 'doc', 'count': 10}, 'text', 3.25, -1.5e-07, True, None, 7]
+        for chunk_size in range(1, 8):
+            json_file = io.StringIO('\n'.join(json.dumps(doc) for doc in docs))
+            self.assertEqual(list(common.iter_json_documents(json_file, chunk_size=chunk_size)), docs)
+            json_file = io.StringIO(json.dumps(docs))
+            self.assertEqual(list(common.iter_json_documents(json_file, chunk_size=chunk_size)), docs)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import io
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+import contextlib
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TESTS_DIR))
+
+from misc_scripts import conversation_workspace_parser
+
+class BatchCacheTest(unittest.TestCase):
+    '''
+    Batch extractions of different types keep their own cache entries, so alternating them skips unchanged workspaces.
+    '''
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp(prefix='workspace_parser_test_')
+        self.cache_file_name = os.path.join(self.work_dir, 'cache.json')
+        self.workspace_dir = os.path.join(self.work_dir, 'workspaces')
+        os.makedirs(self.workspace_dir)
+        workspace = {'intents': [{'intent': 'greeting', 'examples': [{'text': 'hello'}, {'text': 'hi'}]}],
+                     'entities': [{'entity': 'color', 'values': [{'value': 'red', 'synonyms': ['crimson']}]}]}
+        for workspace_number in range(2):
+            with open(os.path.join(self.workspace_dir, 'workspace_%d.json' % workspace_number), 'w', encoding='utf-8') as workspace_file:
+                json.dump(workspace, workspace_file)
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def run_batch(self, extraction_type):
+        with contextlib.redirect_stdout(open(os.devnull, 'w')):
+            return conversation_workspace_parser.parse_workspace_batch(extraction_type, self.workspace_dir, workers=1, cache_file_name=self.cache_file_name)
+
+    def test_alternating_extraction_types(self):
+        self.assertEqual(self.run_batch('intents')['extracted'], 2)
+        self.assertEqual(self.run_batch('entities')['extracted'], 2)
+        self.assertEqual(self.run_batch('intents'), {'extracted': 0, 'skipped': 2, 'failed': 0})
+        self.assertEqual(self.run_batch('entities'), {'extracted': 0, 'skipped': 2, 'failed': 0})
+
+class DuplicatesTest(unittest.TestCase):
+    '''
+    Exact and near matches between examples of different intents, without a report line per intent.
+    '''
+    def test_conflicting_examples(self):
+        workspace = {'intents': [
+            {'intent': 'greeting', 'examples': [{'text': 'Hello there, how are you today'}, {'text': 'good morning to you'}]},
+            {'intent': 'small_talk', 'examples': [{'text': 'hello there how are you today?'}, {'text': 'how are you doing today my friend'}]},
+            {'intent': 'weather', 'examples': [{'text': 'how are you doing today my friends'}, {'text': 'will it rain tomorrow'}]},
+        ] + [{'intent': 'intent_%d' % intent_number, 'examples': [{'text': 'order %s' % (str(intent_number) * 8)}]} for intent_number in range(10)]}
+        report = io.StringIO()
+        with contextlib.redirect_stdout(report):
+            rows = list(conversation_workspace_parser.iter_duplicate_rows(workspace))
+        self.assertEqual(rows[0], conversation_workspace_parser.DUPLICATE_COLUMNS)
+        self.assertEqual([row[:3] + row[4:5] for row in rows[1:]], [['exact', 1.0, 'greeting', 'small_talk'], ['near', 0.909, 'small_talk', 'weather']])
+        self.assertLess(len(report.getvalue().splitlines()), 5)
+
+if __name__ == '__main__':
+    unittest.main()
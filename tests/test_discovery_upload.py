@@ -0,0 +1,89 @@
+import os
+import sys
+import json
+import logging
+import shutil
+import argparse
+import tempfile
+import unittest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TESTS_DIR))
+sys.path.insert(0, os.path.join(os.path.dirname(TESTS_DIR), 'benchmarks'))
+
+import mock_discovery_service
+from misc_scripts import common, discovery_upload
+
+TEST_ENVIRONMENT = 'test_environment'
+TEST_COLLECTION = 'test_collection'
+
+class ManifestReuploadTest(unittest.TestCase):
+    '''
+    Changed documents without an id are updated in place on later -manifest runs, not uploaded as new documents.
+    '''
+    def setUp(self):
+        common.initialize_logger(logging.WARNING)
+        mock_discovery_service.LOGGER.setLevel(logging.WARNING)
+        self.mock_server = mock_discovery_service.start_mock_service(mock_discovery_service.MockServiceConfig(), port=0)
+        self.work_dir = tempfile.mkdtemp(prefix='discovery_upload_test_')
+        self.input_dir = os.path.join(self.work_dir, 'input')
+        self.output_dir = os.path.join(self.work_dir, 'output')
+        os.makedirs(self.input_dir)
+        os.makedirs(self.output_dir)
+        self.creds_file = os.path.join(self.work_dir, 'creds.json')
+        with open(self.creds_file, 'w', encoding='utf8') as creds:
+            json.dump({'test': {'url': 'http://127.0.0.1:%d' % self.mock_server.server_address[1], 'username': 'test', 'password': 'test'}}, creds)
+        for file_number in range(3):
+            self.write_input('document_%d.pdf' % file_number, b'%PDF-1.4 version 1 of document ' + str(file_number).encode('utf8'))
+        self.write_input('documents.ndjson', b'{"title": "first"}\n{"title": "second"}\n')
+
+    def tearDown(self):
+        self.mock_server.shutdown()
+        self.mock_server.server_close()
+        shutil.rmtree(self.work_dir)
+
+    def write_input(self, file_name, content):
+        with open(os.path.join(self.input_dir, file_name), 'wb') as input_file:
+            input_file.write(content)
+
+    def run_upload(self, delete_missing=False):
+        parameters = argparse.Namespace(
+            input_seed=self.input_dir, user_creds_file=self.creds_file, user_creds_key='test', output_dir=self.output_dir,
+            environment_id=TEST_ENVIRONMENT, collection_id=TEST_COLLECTION, max_workers=2, max_in_flight=4,
+            initial_rate=discovery_upload.MAX_REQUEST_RATE, max_rate=discovery_upload.MAX_REQUEST_RATE,
+            upload_engine=discovery_upload.UPLOAD_ENGINE_THREADS, file_workers=2, resume_dir=None,
+            manifest_file=os.path.join(self.work_dir, 'manifest.db'), delete_missing=delete_missing, targets=None,
+            verify_status=False, verify_timeout=discovery_upload.STATUS_POLL_TIMEOUT)
+        discovery_upload.upload_driver(parameters)
+
+    def get_document_ids(self):
+        return set(document_id for (collection_id, document_id) in self.mock_server.RequestHandlerClass.documents if collection_id == TEST_COLLECTION)
+
+    def test_changed_documents_without_id_are_updated(self):
+        self.run_upload()
+        first_document_ids = self.get_document_ids()
+        self.assertEqual(len(first_document_ids), 5)
+
+        self.write_input('document_1.pdf', b'%PDF-1.4 version 2 of document 1')
+        self.write_input('documents.ndjson', b'{"title": "first"}\n{"title": "second, edited"}\n')
+        self.run_upload(delete_missing=True)
+
+        self.assertEqual(self.get_document_ids(), first_document_ids)
+        self.assertEqual(self.mock_server.RequestHandlerClass.config.stats['created'], 7)
+        self.assertEqual(self.mock_server.RequestHandlerClass.config.stats['deleted'], 0)
+
+    def test_same_file_names_in_subdirectories_have_separate_outputs(self):
+        for subdir_name in ('first', 'second'):
+            os.makedirs(os.path.join(self.input_dir, subdir_name))
+            self.write_input(os.path.join(subdir_name, 'documents.ndjson'), b'{"title": "first"}\n{"title": "second"}\n{"title": "third"}\n')
+        self.run_upload()
+
+        run_output_dir = os.path.join(self.output_dir, os.listdir(self.output_dir)[0])
+        for subdir_name in ('first', 'second'):
+            with open(os.path.join(run_output_dir, subdir_name, 'documents' + discovery_upload.INGEST_FILE_EXTENSION), encoding='utf8') as ingestion_log:
+                self.assertEqual(len(ingestion_log.read().splitlines()), 3)
+        with open(os.path.join(run_output_dir, 'documents' + discovery_upload.INGEST_FILE_EXTENSION), encoding='utf8') as ingestion_log:
+            self.assertEqual(len(ingestion_log.read().splitlines()), 2)
+
+if __name__ == '__main__':
+    unittest.main()
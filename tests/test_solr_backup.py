@@ -0,0 +1,114 @@
+import os
+import sys
+import json
+import shutil
+import logging
+import tempfile
+import unittest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TESTS_DIR))
+sys.path.insert(0, os.path.join(os.path.dirname(TESTS_DIR), 'benchmarks'))
+
+import mock_solr_service
+from misc_scripts import solr_backup
+
+class BackupFilesTest(unittest.TestCase):
+    '''
+    Restores and lookups of a directory holding the backups of several collections only read the requested chain.
+    '''
+    def setUp(self):
+        self.backup_dir = tempfile.mkdtemp(prefix='solr_backup_test_')
+        for collection_name in ('first', 'second'):
+            backup_files = ['%s_%d_1.ndjson' % (collection_name, backup_id) for backup_id in (1, 2)]
+            for file_name in backup_files:
+                with open(os.path.join(self.backup_dir, file_name), 'w', encoding='utf8') as backup_file:
+                    backup_file.write(json.dumps({'id': collection_name + '_' + file_name}) + '\n')
+            solr_backup.save_json_file(os.path.join(self.backup_dir, solr_backup.BACKUP_CHAIN_FILE_NAME % collection_name),
+                                       [{'backup_id': '1', 'type': solr_backup.BACKUP_TYPE_FULL, 'parent': None, 'files': [backup_files[0]]},
+                                        {'backup_id': '2', 'type': solr_backup.BACKUP_TYPE_INCREMENTAL, 'parent': '1', 'files': [backup_files[1]]}])
+
+    def tearDown(self):
+        shutil.rmtree(self.backup_dir)
+
+    def test_collection_chain_is_selected(self):
+        backup_files = solr_backup.get_backup_files(self.backup_dir, 'second')
+        self.assertEqual([os.path.basename(file_name) for file_name in backup_files], ['second_1_1.ndjson', 'second_2_1.ndjson'])
+
+    def test_missing_collection_chain(self):
+        with self.assertRaises(ValueError):
+            solr_backup.get_backup_files(self.backup_dir, 'third')
+
+    def test_several_chains_require_a_collection(self):
+        with self.assertRaises(ValueError):
+            solr_backup.get_backup_files(self.backup_dir)
+        os.remove(os.path.join(self.backup_dir, solr_backup.BACKUP_CHAIN_FILE_NAME % 'first'))
+        self.assertEqual(len(solr_backup.get_backup_files(self.backup_dir)), 2)
+
+class RestoreBackupsTest(unittest.TestCase):
+    '''
+    Full backups replaced by later ones are not restored.
+    '''
+    def get_backup(self, backup_id, backup_type, parent=None):
+        return {'backup_id': backup_id, 'type': backup_type, 'parent': parent, 'files': ['%s.ndjson' % backup_id]}
+
+    def test_latest_full_backup_and_its_incremental_backups(self):
+        backup_chain = [self.get_backup('full_1', solr_backup.BACKUP_TYPE_FULL),
+                        self.get_backup('incremental_1', solr_backup.BACKUP_TYPE_INCREMENTAL, 'full_1'),
+                        self.get_backup('full_2', solr_backup.BACKUP_TYPE_FULL),
+                        self.get_backup('filtered_full', solr_backup.BACKUP_TYPE_FULL),
+                        self.get_backup('incremental_2', solr_backup.BACKUP_TYPE_INCREMENTAL, 'full_2'),
+                        self.get_backup('incremental_3', solr_backup.BACKUP_TYPE_INCREMENTAL, 'incremental_2')]
+        restore_backups = solr_backup.get_restore_backups(backup_chain)
+        self.assertEqual([backup['backup_id'] for backup in restore_backups], ['full_2', 'incremental_2', 'incremental_3'])
+
+    def test_same_backup_ids(self):
+        backup_chain = [self.get_backup('backup', solr_backup.BACKUP_TYPE_FULL),
+                        self.get_backup('backup', solr_backup.BACKUP_TYPE_FULL),
+                        self.get_backup('incremental', solr_backup.BACKUP_TYPE_INCREMENTAL, 'backup')]
+        self.assertEqual(solr_backup.get_restore_backups(backup_chain), backup_chain[1:])
+
+class InterruptedBackupTest(unittest.TestCase):
+    '''
+    -resume only takes over the interrupted backups of the collection itself.
+    '''
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp(prefix='solr_backup_test_')
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def write_checkpoint(self, collection_name, backup_id):
+        checkpoint_file_name = os.path.join(self.output_dir, '%s_%s%s' % (collection_name, backup_id, solr_backup.CHECKPOINT_FILE_EXTENSION))
+        solr_backup.save_json_file(checkpoint_file_name, {'backup_id': backup_id, 'complete': False, 'streams': {}})
+
+    def test_other_collection_with_same_prefix(self):
+        self.write_checkpoint('src_v2', '20260101-000000')
+        self.assertIsNone(solr_backup.BackupCheckpoint.find_interrupted(self.output_dir, 'src'))
+        self.write_checkpoint('src', '20250101-000000')
+        checkpoint = solr_backup.BackupCheckpoint.find_interrupted(self.output_dir, 'src')
+        self.assertEqual(checkpoint.backup_info['backup_id'], '20250101-000000')
+
+class RangePartitionTest(unittest.TestCase):
+    '''
+    Range partition boundaries are found in one pass over the ids, across several pages.
+    '''
+    def setUp(self):
+        mock_solr_service.LOGGER.setLevel(logging.WARNING)
+        self.mock_server = mock_solr_service.start_mock_service(mock_solr_service.MockSolrConfig(), port=0)
+        self.solr_client = solr_backup.get_pysolr().Solr('http://127.0.0.1:%d/solr/test_collection' % self.mock_server.server_address[1])
+        self.solr_client.add([{'id': 'doc,%04d' % doc_number} for doc_number in range(1000)], commit=True)
+        self.page_size = solr_backup.RANGE_BOUNDARY_PAGE_SIZE
+        solr_backup.RANGE_BOUNDARY_PAGE_SIZE = 70
+
+    def tearDown(self):
+        solr_backup.RANGE_BOUNDARY_PAGE_SIZE = self.page_size
+        self.mock_server.shutdown()
+        self.mock_server.server_close()
+
+    def test_balanced_ranges(self):
+        partition_filters = solr_backup.get_range_partition_filters(self.solr_client, 'id:[* TO "doc,0900"}', 4)
+        self.assertEqual(partition_filters, ['id:[* TO "doc,0225"}', 'id:["doc,0225" TO "doc,0450"}', 'id:["doc,0450" TO "doc,0675"}', 'id:["doc,0675" TO *]'])
+
+if __name__ == '__main__':
+    unittest.main()